@@ -0,0 +1 @@
+../fix_mermaid/atomic_write.py
\ No newline at end of file
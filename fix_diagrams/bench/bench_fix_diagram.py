@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for fix_diagram over synthetic corpora at 1x, 10x, 100x and 1000x.
+
+Run with:
+    python3 bench/bench_fix_diagram.py -o results.json
+    python3 bench/bench_fix_diagram.py -b grid -b nested --values 10
+"""
+
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+import fix_diagram
+from corpora import CORPORA, SCALES
+import runner
+
+def _factory(corpus, scale):
+    return lambda: corpus(scale)
+
+BENCHMARKS = {
+    f"{name}/{scale}x": (fix_diagram.fix_diagram_improved, _factory(corpus, scale),
+                         {"corpus": name, "scale": scale})
+    for name, corpus in CORPORA.items()
+    for scale in SCALES
+}
+
+if __name__ == "__main__":
+    sys.exit(runner.main("fix_diagram", BENCHMARKS))
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for fix_mermaid over synthetic corpora at 1x, 10x, 100x and 1000x.
+
+The regex/* benchmarks run the id[label] regex that the flowchart lexer
+replaced over the same documents, for comparison. The fixed-chart cache
+and the label memo are cleared before every call, so repeated loops
+measure a cold run (like a hook) rather than cache lookups.
+
+Run with:
+    python3 bench/bench_fix_mermaid.py -o results.json
+"""
+
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(BENCH_DIR.parent.parent / "fix_mermaid"))
+
+import fix_mermaid
+from corpora import MERMAID_CORPORA, SCALES
+import runner
+
+def _factory(corpus, scale):
+    return lambda: corpus(scale)
+
+def fix_cold(text):
+    fix_mermaid.clear_chart_cache()
+    fix_mermaid.clear_label_cache()
+    return fix_mermaid.fix_mermaid(text)
+
+def fix_node_labels_cold(text):
+    fix_mermaid.clear_label_cache()
+    return fix_mermaid.fix_node_labels(text)
+
+BENCHMARKS = {
+    f"{name}/{scale}x": (fix_cold, _factory(corpus, scale),
+                         {"corpus": name, "scale": scale})
+    for name, corpus in MERMAID_CORPORA.items()
+    for scale in SCALES
+}
+BENCHMARKS.update({
+    f"regex/{name}/{scale}x": (fix_node_labels_cold, _factory(corpus, scale),
+                               {"corpus": name, "scale": scale, "engine": "regex"})
+    for name, corpus in MERMAID_CORPORA.items()
+    for scale in SCALES
+})
+
+if __name__ == "__main__":
+    sys.exit(runner.main("fix_mermaid", BENCHMARKS))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Compare benchmark results against a baseline and fail on significant regressions.
+
+A benchmark regresses when its mean time grew by more than its tolerance AND
+Welch's t-test over the raw samples says the difference is significant, so a
+noisy run alone does not fail the gate. Everything is pure Python and runs
+offline.
+
+Run with:
+    python3 bench/compare.py bench/baseline/fix_diagram.json diagram.json
+    python3 bench/compare.py bench/baseline/fix_diagram.json diagram.json \\
+        bench/baseline/fix_mermaid.json mermaid.json --tolerance 'grid/*=0.25' \\
+        --tolerance 'flowchart/*=0.25' --tolerance 'regex/*=0.5'
+"""
+
+import sys
+import json
+import math
+import argparse
+import fnmatch
+import statistics
+from typing import List, Optional, Tuple
+
+DEFAULT_TOLERANCE = 0.10  # Allowed slowdown before a significant change counts as a regression
+DEFAULT_ALPHA = 0.05  # Significance level for Welch's t-test
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Continued fraction for the regularized incomplete beta function (Lentz's method)."""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-12:
+            break
+    return h
+
+def betainc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                 + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return math.exp(log_front) * _betacf(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _betacf(b, a, 1.0 - x) / b
+
+def welch_t_test(sample_a: List[float], sample_b: List[float]) -> Tuple[float, float]:
+    """Two-sided Welch's t-test; returns (t statistic, p-value)."""
+    n_a, n_b = len(sample_a), len(sample_b)
+    if n_a < 2 or n_b < 2:
+        return 0.0, 1.0
+    mean_a, mean_b = statistics.fmean(sample_a), statistics.fmean(sample_b)
+    se2_a = statistics.variance(sample_a) / n_a
+    se2_b = statistics.variance(sample_b) / n_b
+    if se2_a + se2_b == 0.0:
+        return (0.0, 1.0) if mean_a == mean_b else (math.copysign(math.inf, mean_b - mean_a), 0.0)
+    t = (mean_b - mean_a) / math.sqrt(se2_a + se2_b)
+    df = (se2_a + se2_b) ** 2 / (se2_a ** 2 / (n_a - 1) + se2_b ** 2 / (n_b - 1))
+    p = betainc(df / 2.0, 0.5, df / (df + t * t))
+    return t, p
+
+def load_results(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    if "benchmarks" not in document:
+        raise ValueError(f"{path} is not a benchmark result file")
+    return document
+
+def tolerance_for(name: str, overrides: List[Tuple[str, float]], default: float) -> float:
+    """Last matching NAME_GLOB=TOLERANCE override wins."""
+    tolerance = default
+    for pattern, value in overrides:
+        if fnmatch.fnmatchcase(name, pattern):
+            tolerance = value
+    return tolerance
+
+def compare(baseline: dict, current: dict, overrides: List[Tuple[str, float]],
+            default_tolerance: float, alpha: float) -> List[dict]:
+    """Compare every benchmark present in both result documents."""
+    base_by_name = {b["name"]: b for b in baseline["benchmarks"]}
+    rows = []
+    for bench in current["benchmarks"]:
+        base = base_by_name.get(bench["name"])
+        if base is None:
+            continue
+        base_mean = statistics.fmean(base["values"])
+        mean = statistics.fmean(bench["values"])
+        ratio = mean / base_mean if base_mean else math.inf
+        _, p = welch_t_test(base["values"], bench["values"])
+        tolerance = tolerance_for(bench["name"], overrides, default_tolerance)
+        significant = p < alpha
+        if significant and ratio > 1.0 + tolerance:
+            verdict = "REGRESSION"
+        elif significant and ratio < 1.0 / (1.0 + tolerance):
+            verdict = "faster"
+        else:
+            verdict = "same"
+        rows.append({"name": bench["name"], "base": base_mean, "current": mean, "ratio": ratio,
+                     "p": p, "tolerance": tolerance, "verdict": verdict})
+    missing = sorted(set(base_by_name) - {b["name"] for b in current["benchmarks"]})
+    for name in missing:
+        rows.append({"name": name, "base": statistics.fmean(base_by_name[name]["values"]), "current": None,
+                     "ratio": None, "p": None, "tolerance": None, "verdict": "missing"})
+    return rows
+
+def _format_time(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds * 1e9:.0f}ns"
+
+def print_table(suite: str, rows: List[dict]) -> None:
+    print(f"{suite}")
+    print("=" * 86)
+    print(f"{'benchmark':<28} {'baseline':>10} {'current':>10} {'change':>9} {'p-value':>8} {'tol':>5}  verdict")
+    for row in rows:
+        change = f"{(row['ratio'] - 1) * 100:+.1f}%" if row["ratio"] is not None else "-"
+        p = f"{row['p']:.3f}" if row["p"] is not None else "-"
+        tolerance = f"{row['tolerance'] * 100:.0f}%" if row["tolerance"] is not None else "-"
+        marker = {"REGRESSION": "❌ ", "faster": "🚀 "}.get(row["verdict"], "")
+        print(f"{row['name']:<28} {_format_time(row['base']):>10} {_format_time(row['current']):>10} "
+              f"{change:>9} {p:>8} {tolerance:>5}  {marker}{row['verdict']}")
+    print()
+
+def _parse_override(text: str) -> Tuple[str, float]:
+    pattern, _, value = text.rpartition("=")
+    if not pattern:
+        raise argparse.ArgumentTypeError(f"expected NAME_GLOB=FRACTION, got {text!r}")
+    return pattern, float(value)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Flag significant benchmark regressions against a baseline.")
+    parser.add_argument("files", nargs="+", metavar="BASELINE CURRENT",
+                        help="pairs of result files: baseline first, then the run to check")
+    parser.add_argument("--tolerance", action="append", default=[], type=_parse_override, metavar="GLOB=FRACTION",
+                        help="per-benchmark allowed slowdown, e.g. 'grid/*=0.25' (repeatable)")
+    parser.add_argument("--default-tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed slowdown when no --tolerance matches (default {DEFAULT_TOLERANCE})")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA,
+                        help=f"significance level for Welch's t-test (default {DEFAULT_ALPHA})")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="do not fail when a baseline benchmark is missing from the current run")
+    args = parser.parse_args(argv)
+
+    if len(args.files) % 2:
+        parser.error("result files must be given in BASELINE CURRENT pairs")
+
+    failed = False
+    for base_path, current_path in zip(args.files[::2], args.files[1::2]):
+        baseline, current = load_results(base_path), load_results(current_path)
+        if baseline.get("suite") != current.get("suite"):
+            parser.error(f"{base_path} is suite {baseline.get('suite')!r} but "
+                         f"{current_path} is suite {current.get('suite')!r}")
+        rows = compare(baseline, current, args.tolerance, args.default_tolerance, args.alpha)
+        print_table(f"{current.get('suite')}: {base_path} -> {current_path}", rows)
+        for row in rows:
+            if row["verdict"] == "REGRESSION" or (row["verdict"] == "missing" and not args.allow_missing):
+                failed = True
+
+    if failed:
+        print("❌ Performance regression detected")
+        return 1
+    print("🎉 No significant regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Scalable synthetic documents for the fix_diagram and fix_mermaid benchmarks.
+
+Each corpus is a function of an integer scale. Scale 1 is a small, realistic
+document of a few hundred bytes to 2 KiB, and the document grows linearly
+with the scale, so 1000x reaches hundreds of kilobytes. Bottom borders are
+deliberately misaligned in part of each document, so the fixer has real work
+to do rather than taking a shortcut.
+"""
+
+from typing import Callable, Dict
+
+def single_box(scale: int) -> str:
+    """One box whose width grows with the scale."""
+    width = 12 * scale
+    label = "Service".center(width)
+    return ("# Single Box\n\n```\n"
+            f"┌{'─' * width}┐\n"
+            f"│{label}│\n"
+            f"│{'handles requests'.center(width)}│\n"
+            f"└{'─' * (width + 3)}┘\n"
+            "```\n")
+
+def horizontal_chain(scale: int) -> str:
+    """One row of 4*scale boxes joined by right arrows."""
+    count = 4 * scale
+    top = "────▶".join(["┌───────┐"] * count)
+    mid = "     ".join(["│ Step  │"] * count)
+    bottom = "     ".join(["└─────────┘"] * count)
+    return f"# Horizontal Chain\n\n```\n{top}\n{mid}\n{bottom}\n```\n"
+
+def grid(scale: int, columns: int = 4) -> str:
+    """A grid of 4*scale boxes, `columns` per row, every other row misaligned."""
+    rows = []
+    for row in range(scale):
+        rows.append("     ".join(["┌──────────┐"] * columns))
+        rows.append("     ".join([f"│ Cell {row % 100:02d}  │"] * columns))
+        bottom = "└────────────┘" if row % 2 else "└──────────┘"
+        rows.append("     ".join([bottom] * columns))
+        rows.append("")
+    return "# Grid\n\n```\n" + "\n".join(rows) + "```\n"
+
+def nested(scale: int, columns: int = 4) -> str:
+    """4*scale outer boxes, each holding a misaligned inner box."""
+    parts = ("┌──────────┐ ", "│ ┌──────┐ │ ", "│ │ item │ │ ", "│ └────────┘ │ ", "└──────────┘ ")
+    rows = []
+    for _ in range(scale):
+        for part in parts:
+            rows.append(part * columns)
+    return "# Nested\n\n```\n" + "\n".join(rows) + "\n```\n"
+
+def arrow_heavy(scale: int) -> str:
+    """scale stages of three boxes joined by horizontal and vertical arrows."""
+    blocks = []
+    for _ in range(scale):
+        blocks.append("┌─────┐────▶┌─────┐◀────┌─────┐")
+        blocks.append("│  A  │     │  B  │     │  C  │")
+        blocks.append("└───────┘     └─────┘     └─────┘")
+        blocks.append("   │           │           │")
+        blocks.append("   ▼           ▼           ▼")
+    return "# Arrow Heavy\n\n```\n" + "\n".join(blocks) + "\n```\n"
+
+PROSE = ("The ingestion service batches incoming documents, validates their "
+         "front matter and hands each one to the renderer. Failures are retried "
+         "with exponential backoff and reported on the status page.\n")
+
+def prose_heavy(scale: int) -> str:
+    """scale sections of mostly prose and code, with one small diagram each."""
+    sections = []
+    for i in range(scale):
+        sections.append(f"## Section {i}\n\n" + PROSE * 6 +
+                        "\n```python\nfor item in queue:\n    process(item)\n```\n\n" +
+                        "```\n┌──────────┐\n│ Worker   │\n└────────────┘\n```\n\n" + PROSE * 2)
+    return "# Prose Heavy\n\n" + "\n".join(sections)
+
+CORPORA: Dict[str, Callable[[int], str]] = {
+    "single_box": single_box,
+    "horizontal_chain": horizontal_chain,
+    "grid": grid,
+    "nested": nested,
+    "arrow_heavy": arrow_heavy,
+    "prose_heavy": prose_heavy,
+}
+
+SCALES = (1, 10, 100, 1000)
+
+def _flowchart(nodes: int) -> str:
+    """A mermaid flowchart of `nodes` nodes in a chain with a few long, unsafe labels."""
+    lines = ["graph TD"]
+    for i in range(nodes):
+        if i % 5 == 0:
+            label = f"Validate <input> & normalize \"payload\" for stage {i} before handing it to the next worker"
+        else:
+            label = f"Step {i}"
+        lines.append(f"    N{i}[{label}]")
+        if i:
+            lines.append(f"    N{i - 1} --> N{i}")
+    return "\n".join(lines)
+
+def mermaid_flowchart(scale: int) -> str:
+    """One chart whose node count grows with the scale (10 nodes at 1x)."""
+    return "# Flowchart\n\n```mermaid\n" + _flowchart(10 * scale) + "\n```\n"
+
+def mermaid_prd(scale: int) -> str:
+    """scale PRD sections of prose, markdown links and a small chart each."""
+    sections = []
+    for i in range(scale):
+        sections.append(f"## Requirement {i}\n\n" + PROSE * 4 +
+                        "\nSee [the design doc](docs/design.md) and `items[0]`.\n\n"
+                        "- [x] reviewed\n- [ ] approved\n\n"
+                        "```mermaid\n" + _flowchart(6) + "\n```\n")
+    return "# PRD\n\n" + "\n".join(sections)
+
+SHAPES = ("[{}]", "({})", "{{{}}}", "(({}))", ">{}]", "[({})]", "[[{}]]", "{{{{{}}}}}", "([{}])", "[/{}/]")
+
+def mermaid_shapes(scale: int) -> str:
+    """A flowchart of 10*scale nodes cycling through every node shape, with labelled edges."""
+    lines = ["flowchart LR"]
+    for i in range(10 * scale):
+        label = f"Check <{i}> & retry" if i % 3 == 0 else f"Stage {i}"
+        lines.append(f"    S{i}" + SHAPES[i % len(SHAPES)].format(label))
+        if i:
+            lines.append(f"    S{i - 1} -->|{'ok & next' if i % 2 else 'done'}| S{i}")
+    return "# Shapes\n\n```mermaid\n" + "\n".join(lines) + "\n```\n"
+
+MERMAID_CORPORA: Dict[str, Callable[[int], str]] = {
+    "flowchart": mermaid_flowchart,
+    "prd": mermaid_prd,
+    "shapes": mermaid_shapes,
+}
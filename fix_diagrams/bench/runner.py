@@ -0,0 +1,181 @@
+"""
+Small pyperf-style benchmark runner shared by the bench_*.py scripts.
+
+Every benchmark runs in a fresh worker process so peak RSS is per benchmark
+and one case cannot warm caches for the next. Inside the worker the number
+of inner loops is calibrated so one sample takes at least --min-time, a few
+warmup samples are discarded, and then --values samples are recorded as
+seconds per call. Results are written as JSON, including the raw samples, so
+runs can be compared against a stored baseline.
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+# name -> (function under test, input text factory, metadata)
+Benchmark = tuple
+
+RESULT_FORMAT_VERSION = 1
+MAX_LOOPS = 1 << 20
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+def _peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+def _time_loops(func: Callable[[str], object], text: str, loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        func(text)
+    return time.perf_counter() - start
+
+def measure(func: Callable[[str], object], text: str, values: int, warmups: int, min_time: float) -> dict:
+    """Calibrate, warm up and sample one benchmark in the current process."""
+    gc.collect()
+    loops = 1
+    while True:
+        elapsed = _time_loops(func, text, loops)
+        if elapsed >= min_time or loops >= MAX_LOOPS:
+            break
+        # Jump straight to the estimated loop count, at least doubling each round
+        loops = min(MAX_LOOPS, max(loops * 2, int(loops * min_time * 1.1 / max(elapsed, 1e-9))))
+
+    warmup_values = [_time_loops(func, text, loops) / loops for _ in range(warmups)]
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(values):
+            samples.append(_time_loops(func, text, loops) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {"loops": loops, "warmups": warmup_values, "values": samples}
+
+def summarize(result: dict) -> dict:
+    """Add derived statistics (mean, stdev, ops/sec, ns per byte) to a result."""
+    values = result["values"]
+    mean = statistics.fmean(values)
+    result["mean"] = mean
+    result["median"] = statistics.median(values)
+    result["stdev"] = statistics.stdev(values) if len(values) > 1 else 0.0
+    result["ops_per_sec"] = 1.0 / mean if mean else float("inf")
+    result["ns_per_byte"] = mean * 1e9 / result["bytes"] if result["bytes"] else 0.0
+    return result
+
+def _run_worker(benchmarks: Dict[str, Benchmark], name: str, args) -> None:
+    func, make_text, meta = benchmarks[name]
+    text = make_text()
+    result = measure(func, text, args.values, args.warmups, args.min_time)
+    result.update(name=name, bytes=len(text.encode("utf-8")), peak_rss_kb=_peak_rss_kb(), **meta)
+    json.dump(result, sys.stdout)
+
+def _spawn_worker(script: str, name: str, args) -> dict:
+    command = [sys.executable, script, "--worker", name,
+               "--values", str(args.values), "--warmups", str(args.warmups), "--min-time", str(args.min_time)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"worker for {name} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout)
+
+def _format_rate(ops: float) -> str:
+    for unit, scale in (("M", 1e6), ("k", 1e3)):
+        if ops >= scale:
+            return f"{ops / scale:.2f}{unit}"
+    return f"{ops:.2f}"
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds * 1e9:.0f}ns"
+
+def main(suite: str, benchmarks: Dict[str, Benchmark], argv: Optional[List[str]] = None) -> int:
+    """Command line entry point for a benchmark script defining `benchmarks`."""
+    parser = argparse.ArgumentParser(description=f"Benchmarks for {suite}.")
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("-b", "--bench", action="append", default=[],
+                        help="only run benchmarks whose name contains this text (repeatable)")
+    parser.add_argument("--values", type=int, default=5, help="recorded samples per process (default 5)")
+    parser.add_argument("--warmups", type=int, default=1, help="discarded warmup samples (default 1)")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes per benchmark (default 1)")
+    parser.add_argument("--min-time", type=float, default=0.1,
+                        help="minimum seconds per sample; loops are calibrated to reach it (default 0.1)")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        _run_worker(benchmarks, args.worker, args)
+        return 0
+
+    names = [name for name in benchmarks if not args.bench or any(b in name for b in args.bench)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    if not names:
+        print("No benchmarks match the selection")
+        return 1
+
+    script = os.path.abspath(sys.argv[0])
+    print(f"{suite} benchmarks ({args.processes} process x {args.values} values, {args.warmups} warmup)")
+    print("=" * 86)
+    print(f"{'benchmark':<28} {'bytes':>10} {'mean':>10} {'± stdev':>9} {'ops/sec':>9} {'ns/byte':>9} {'peak RSS':>9}")
+
+    results = []
+    for name in names:
+        runs = [_spawn_worker(script, name, args) for _ in range(args.processes)]
+        result = runs[0]
+        for extra in runs[1:]:
+            result["values"].extend(extra["values"])
+            result["warmups"].extend(extra["warmups"])
+            result["peak_rss_kb"] = max(result["peak_rss_kb"] or 0, extra["peak_rss_kb"] or 0)
+        summarize(result)
+        results.append(result)
+        print(f"{name:<28} {result['bytes']:>10} {_format_time(result['mean']):>10} "
+              f"{_format_time(result['stdev']):>9} {_format_rate(result['ops_per_sec']):>9} "
+              f"{result['ns_per_byte']:>9.1f} {(result['peak_rss_kb'] or 0) / 1024:>7.1f}MB")
+
+    if args.output:
+        document = {
+            "version": RESULT_FORMAT_VERSION,
+            "suite": suite,
+            "metadata": {
+                "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "implementation": platform.python_implementation(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "revision": _git_revision(),
+                "values": args.values,
+                "warmups": args.warmups,
+                "processes": args.processes,
+                "min_time": args.min_time,
+            },
+            "benchmarks": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=1)
+        print(f"\nResults written to {args.output}")
+    return 0
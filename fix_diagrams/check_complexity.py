@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Worst-case complexity check for the diagram detector.
+
+Runs every adversarial generator in test_data/generate_adversarial.py at
+doubling sizes, fits the growth exponent k in time ~ size^k with a
+least-squares line through log(size) / log(time), and fails if any case
+grows faster than its bound.
+
+Run with: python3 check_complexity.py [--bound 1.4] [--steps 5]
+"""
+
+import gc
+import sys
+import math
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "test_data"))
+
+import fix_diagram
+from generate_adversarial import GENERATORS
+
+DEFAULT_BOUND = 1.4  # Linear is 1.0, quadratic is 2.0; the margin absorbs timer noise
+
+# Starting size per case, chosen so the smallest run takes a few milliseconds
+START_SIZES = {
+    "unmatched_corners": 200,
+    "deep_bottom_column": 4000,
+    "long_lines": 500,
+    "arrow_heavy": 100,
+    "nested_grid": 200,
+}
+
+# Per-case overrides of the default bound
+BOUNDS: Dict[str, float] = {}
+
+def time_fix(text: str, repeat: int) -> float:
+    """Best-of-repeat wall time for one unbudgeted fix of text, with GC paused."""
+    best = float('inf')
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fix_diagram.fix_diagram_improved(text)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+def fit_exponent(points: List[Tuple[int, float]]) -> float:
+    """Slope of the least-squares line through (log size, log seconds)."""
+    xs = [math.log(size) for size, _ in points]
+    ys = [math.log(max(seconds, 1e-9)) for _, seconds in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return covariance / variance
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if the detector scales worse than a bound on adversarial input.")
+    parser.add_argument("--bound", type=float, default=DEFAULT_BOUND,
+                        help=f"maximum allowed growth exponent (default {DEFAULT_BOUND})")
+    parser.add_argument("--steps", type=int, default=5, help="number of doubling sizes per case (default 5)")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats per size, best is kept (default 5)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every starting size")
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name contains PATTERN")
+    args = parser.parse_args()
+
+    print("Detector Complexity Check")
+    print("=" * 70)
+
+    failed = []
+    for name, generate in GENERATORS.items():
+        if args.pattern and args.pattern not in name:
+            continue
+        bound = BOUNDS.get(name, args.bound)
+        base = max(1, int(START_SIZES.get(name, 100) * args.scale))
+        points = []
+        for step in range(args.steps):
+            text = generate(base * 2 ** step)
+            points.append((len(text), time_fix(text, args.repeat)))
+        exponent = fit_exponent(points)
+        ok = exponent <= bound
+        if not ok:
+            failed.append(name)
+        timings = "  ".join(f"{size // 1024}KiB:{seconds * 1000:.1f}ms" for size, seconds in points)
+        status = "✅" if ok else "❌"
+        print(f"{status} {name:<20} k={exponent:4.2f} (bound {bound:g})  {timings}")
+
+    print("=" * 70)
+    if failed:
+        print(f"❌ Super-linear growth in: {', '.join(failed)}")
+        return 1
+    print("🎉 All cases within bound")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
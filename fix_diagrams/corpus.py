@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Single-file fixture corpus for the diagram alignment tests.
+
+A corpus is a JSONL file with one test case per line:
+
+    {"name": "basic/test_01_single_box", "input": "...", "expected": "..."}
+
+Cases may carry extra keys after these three; the runner ignores them.
+The name is always the first key, so a Corpus can index a file by memory
+mapping it and scanning for newlines and names only. A case's input and
+expected text are decoded when that case is asked for. Loading a large
+fixture set therefore costs one open, not two per test.
+
+The corpus is the only committed copy of the fixtures. It round-trips
+losslessly with the test_data directory layout ({name}_input.md /
+{name}_expected.md), byte for byte, so they can be exported, edited as
+files and built back.
+
+Usage:
+    python3 corpus.py build  [--from test_data] [-o test_data/corpus.jsonl]
+    python3 corpus.py export [-i test_data/corpus.jsonl] [--to test_data]
+    python3 corpus.py verify [-i test_data/corpus.jsonl] [--against test_data]
+    python3 corpus.py list   [-i test_data/corpus.jsonl]
+"""
+
+import os
+import sys
+import json
+import mmap
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from atomic_write import write_text_atomic
+
+DEFAULT_CORPUS = "test_data/corpus.jsonl"
+NAME_PREFIX = b'{"name": '
+
+class Corpus:
+    """Lazily loaded, read-only view of a corpus file.
+
+    Only line offsets and names are read up front; `get(name)` parses
+    that single line. Use as a context manager or call close().
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._offsets: Dict[str, tuple] = {}
+        self._index()
+
+    def _index(self) -> None:
+        data = self._data
+        decoder = json.JSONDecoder()
+        start = 0
+        end_of_data = len(data)
+        while start < end_of_data:
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = end_of_data
+            if end > start:
+                if data[start:start + len(NAME_PREFIX)] != NAME_PREFIX:
+                    raise ValueError(f"{self.path}: record at byte {start} does not start with a name")
+                # Decode just the name string; the rest of the line stays untouched
+                head = data[start + len(NAME_PREFIX):min(end, start + len(NAME_PREFIX) + 4096)]
+                name, _ = decoder.raw_decode(head.decode("utf-8", errors="ignore"))
+                self._offsets[name] = (start, end)
+            start = end + 1
+
+    def __enter__(self) -> "Corpus":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._offsets
+
+    def names(self) -> List[str]:
+        return list(self._offsets)
+
+    def get(self, name: str) -> dict:
+        """Return {'name', 'input', 'expected'} for one case."""
+        start, end = self._offsets[name]
+        return json.loads(self._data[start:end].decode("utf-8"))
+
+    def __iter__(self) -> Iterator[dict]:
+        for name in self._offsets:
+            yield self.get(name)
+
+def _record(case: dict) -> str:
+    # Extra keys (e.g. mutation metadata) ride along after the three required ones
+    record = {"name": case["name"], "input": case["input"], "expected": case["expected"]}
+    record.update((key, value) for key, value in case.items() if key not in record)
+    return json.dumps(record, ensure_ascii=False)
+
+def write_corpus(path, cases: Iterable[dict]) -> int:
+    """Write cases to path atomically, sorted by name. Returns the case count."""
+    records = sorted(cases, key=lambda case: case["name"])
+    write_text_atomic(path, "".join(_record(case) + "\n" for case in records))
+    return len(records)
+
+def update_corpus(path, cases: Iterable[dict]) -> int:
+    """Add or replace cases by name, keeping the rest of the corpus. Returns the total count."""
+    path = Path(path)
+    merged = {}
+    if path.exists():
+        with Corpus(path) as corpus:
+            merged = {case["name"]: case for case in corpus}
+    for case in cases:
+        merged[case["name"]] = case
+    return write_corpus(path, merged.values())
+
+def add_templates(path, templates: Dict[str, dict], force: bool = False) -> int:
+    """Add {name: {'input', 'expected'}} templates to the corpus at path; returns how many were written.
+
+    Cases already in the corpus are canonical and left alone unless force
+    is set; the templates may lag behind fixes made to them since.
+    """
+    existing = set()
+    if not force and Path(path).exists():
+        with Corpus(path) as corpus:
+            existing = set(corpus.names())
+    cases = [{"name": name, "input": data["input"], "expected": data["expected"]}
+             for name, data in templates.items() if name not in existing]
+    total = update_corpus(path, cases)
+    for case in cases:
+        print(f"Created: {case['name']}")
+    kept = len(templates) - len(cases)
+    print(f"\nWrote {len(cases)} test cases, kept {kept} existing ones; the corpus now holds {total}.")
+    if kept:
+        print("Pass --force to overwrite existing cases with the templates.")
+    return len(cases)
+
+def templates_main(path, templates: Dict[str, dict], description: str,
+                   argv: Optional[List[str]] = None) -> int:
+    """Command line for the test_data generators: add their templates to the corpus."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--force", action="store_true", help="overwrite cases that are already in the corpus")
+    args = parser.parse_args(argv)
+    print(f"Generating test cases into {path}...")
+    add_templates(path, templates, args.force)
+    return 0
+
+def _read_exact(path: Path) -> str:
+    # newline='' keeps \r\n and lone \r exactly as stored
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return f.read()
+
+def read_directory(test_dir) -> Iterator[dict]:
+    """Yield every {name}_input.md / {name}_expected.md pair under test_dir."""
+    test_dir = Path(test_dir)
+    for input_file in sorted(test_dir.rglob("*_input.md")):
+        name = input_file.relative_to(test_dir).as_posix()[:-len("_input.md")]
+        expected_file = test_dir / f"{name}_expected.md"
+        if expected_file.exists():
+            yield {"name": name, "input": _read_exact(input_file), "expected": _read_exact(expected_file)}
+
+def export_directory(corpus: Corpus, test_dir) -> int:
+    """Write every case back to the directory layout. Returns the case count."""
+    test_dir = Path(test_dir)
+    count = 0
+    for case in corpus:
+        for kind in ("input", "expected"):
+            target = test_dir / f"{case['name']}_{kind}.md"
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(target, 'w', encoding='utf-8', newline='') as f:
+                f.write(case[kind])
+        count += 1
+    return count
+
+def verify(corpus: Corpus, test_dir) -> List[str]:
+    """Return a list of differences between the corpus and the directory layout."""
+    problems = []
+    on_disk = {case["name"]: case for case in read_directory(test_dir)}
+    for name in corpus.names():
+        if name not in on_disk:
+            problems.append(f"only in corpus: {name}")
+            continue
+        case = corpus.get(name)
+        for kind in ("input", "expected"):
+            if case[kind] != on_disk[name][kind]:
+                problems.append(f"{kind} differs: {name}")
+    for name in sorted(set(on_disk) - set(corpus.names())):
+        problems.append(f"only in directory: {name}")
+    return problems
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build, export and check the single-file fixture corpus.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="pack the directory layout into a corpus file")
+    build.add_argument("--from", dest="source", default="test_data")
+    build.add_argument("-o", "--output", default=DEFAULT_CORPUS)
+    export = sub.add_parser("export", help="unpack a corpus file into the directory layout")
+    export.add_argument("-i", "--input", default=DEFAULT_CORPUS)
+    export.add_argument("--to", dest="target", default="test_data")
+    check = sub.add_parser("verify", help="check that a corpus and a directory hold the same fixtures")
+    check.add_argument("-i", "--input", default=DEFAULT_CORPUS)
+    check.add_argument("--against", default="test_data")
+    listing = sub.add_parser("list", help="list the case names in a corpus")
+    listing.add_argument("-i", "--input", default=DEFAULT_CORPUS)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = write_corpus(args.output, read_directory(args.source))
+        print(f"Wrote {count} cases to {args.output}")
+        return 0
+
+    with Corpus(args.input) as corpus:
+        if args.command == "export":
+            count = export_directory(corpus, args.target)
+            print(f"Exported {count} cases to {args.target}")
+        elif args.command == "verify":
+            problems = verify(corpus, args.against)
+            for problem in problems:
+                print(problem)
+            if problems:
+                print(f"❌ {len(problems)} differences between {args.input} and {args.against}")
+                return 1
+            print(f"✅ {args.input} matches {args.against} ({len(corpus)} cases)")
+        else:
+            try:
+                print("\n".join(corpus.names()))
+            except BrokenPipeError:
+                # e.g. piped into head; silence the flush at exit too
+                sys.stdout = open(os.devnull, 'w')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
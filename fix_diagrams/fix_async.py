@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Asyncio front end for the diagram and mermaid fixers.
+
+File reads and writes run off the event loop, and the CPU-bound fixing is
+handed to a bounded executor (threads for normal files, a process pool for
+big inputs) so an asyncio service can fix documents without stalling.
+
+Usage:
+    python3 fix_async.py file.md [more.md ...]     # fix in place, concurrently
+    python3 fix_async.py --hook < hook.json        # post-write hook running both fixers
+    python3 fix_async.py --bench                   # event-loop latency benchmark
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+import fix_diagram
+from atomic_write import write_text_atomic
+
+try:
+    import fix_mermaid
+except ImportError:
+    # Repository layout: fix_mermaid/ sits next to fix_diagrams/
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fix_mermaid"))
+    import fix_mermaid
+
+import fix_pipeline
+
+DEFAULT_FIXERS = ("diagram", "mermaid")
+DEFAULT_CONCURRENCY = 8
+PROCESS_POOL_THRESHOLD = 256 * 1024  # Inputs at least this large (chars) go to the process pool
+
+def apply_fixers(text: str, fixers: Tuple[str, ...] = DEFAULT_FIXERS,
+                 budget: Optional[fix_diagram.Budget] = None) -> str:
+    """Run the selected fixers over text through fix_pipeline, block by block.
+
+    Module-level so it can be shipped to a process pool worker; fixers are
+    looked up by name there. Without a budget one is taken from the
+    environment, and BudgetExceeded is raised when it runs out.
+    """
+    return fix_pipeline.run_pipeline(text, fix_pipeline.select_fixers(fixers),
+                                     budget if budget is not None else fix_diagram.Budget.from_env())
+
+
+def _read_text(path: Path) -> str:
+    # newline='' keeps CRLF files byte for byte outside the fixed segments, as in fix_pipeline
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+class AsyncFixer:
+    """Bounded, non-blocking fixer for use inside a running event loop.
+
+    At most `max_concurrency` documents are being fixed at any time; further
+    callers wait on a semaphore, which is the backpressure for producers that
+    submit faster than the executor drains.
+    """
+
+    def __init__(self,
+                 fixers: Iterable[str] = DEFAULT_FIXERS,
+                 max_concurrency: int = DEFAULT_CONCURRENCY,
+                 max_workers: Optional[int] = None,
+                 process_threshold: Optional[int] = PROCESS_POOL_THRESHOLD):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.fixers = tuple(fixers)
+        fix_pipeline.select_fixers(self.fixers)  # Fail here, not in a worker, on an unknown name
+        self.max_concurrency = max_concurrency
+        self.max_workers = max_workers or min(max_concurrency, os.cpu_count() or 1)
+        self.process_threshold = process_threshold
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._threads = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix="fix_async")
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    async def __aenter__(self) -> "AsyncFixer":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the executors without blocking the event loop.
+
+        Queued work that has not started is cancelled; work already running
+        finishes in the background and its result is dropped.
+        """
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+    def _executor_for(self, text: str):
+        if self.process_threshold is not None and len(text) >= self.process_threshold:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._processes
+        return self._threads
+
+    async def fix_text(self, text: str) -> str:
+        """Fix text in an executor and return the fixed text."""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor_for(text),
+                                              apply_fixers, text, self.fixers)
+
+    async def fix_file(self, path, write: bool = True) -> dict:
+        """Fix one file, writing it back in place only if it changed.
+
+        Returns a result dict with 'path', 'changed', 'seconds', 'error'
+        (None on success) and 'skipped' (the BudgetExceeded message when the
+        file was left alone). Errors are reported, not raised, so one bad
+        file does not abort a batch.
+        """
+        path = Path(path)
+        start = time.perf_counter()
+        result = {"path": str(path), "changed": False, "seconds": 0.0, "error": None, "skipped": None}
+        try:
+            content = await asyncio.to_thread(_read_text, path)
+            fixed = await self.fix_text(content)
+            if fixed != content:
+                result["changed"] = True
+                if write:
+                    await asyncio.to_thread(write_text_atomic, path, fixed)
+        except fix_diagram.BudgetExceeded as e:
+            result["skipped"] = f"{e}. Raise {fix_diagram.BUDGET_ENV_VARS[e.setting]} to allow more."
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = time.perf_counter() - start
+        return result
+
+    async def fix_paths(self, paths: Iterable, write: bool = True) -> AsyncIterator[dict]:
+        """Fix many files, yielding each result as soon as it finishes.
+
+        Paths are pulled lazily and never more than `max_concurrency` files
+        are in flight, so an unbounded iterable of paths is safe.
+        """
+        pending = set()
+        path_iter = iter(paths)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.max_concurrency:
+                    try:
+                        path = next(path_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(self.fix_file(path, write=write)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def fix_text_async(text: str, fixers: Iterable[str] = DEFAULT_FIXERS) -> str:
+    """One-shot helper: fix a single string without blocking the event loop."""
+    async with AsyncFixer(fixers=fixers, max_concurrency=1) as fixer:
+        return await fixer.fix_text(text)
+
+
+async def fix_file_async(path, fixers: Iterable[str] = DEFAULT_FIXERS, write: bool = True) -> dict:
+    """One-shot helper: fix a single file in place without blocking the event loop."""
+    async with AsyncFixer(fixers=fixers, max_concurrency=1) as fixer:
+        return await fixer.fix_file(path, write=write)
+
+
+async def fix_paths_async(paths: Iterable,
+                          fixers: Iterable[str] = DEFAULT_FIXERS,
+                          max_concurrency: int = DEFAULT_CONCURRENCY,
+                          write: bool = True,
+                          **kwargs) -> AsyncIterator[dict]:
+    """Fix files concurrently, streaming result dicts in completion order.
+
+    Example:
+        async for result in fix_paths_async(paths):
+            if result['error']:
+                log.warning(result['error'])
+    """
+    async with AsyncFixer(fixers=fixers, max_concurrency=max_concurrency, **kwargs) as fixer:
+        async for result in fixer.fix_paths(paths, write=write):
+            yield result
+
+
+# ---------------------------------------------------------------------------
+# Event-loop latency benchmark
+# ---------------------------------------------------------------------------
+
+BENCH_DOCUMENT = """# Benchmark Document
+
+```
+┌─────────────┐     ┌─────────────────┐
+│   Service A │────▶│   Service B     │
+│   Auth      │     │   Processing    │
+└─────────────────┘     └──────────────────┘
+```
+
+Some prose between diagrams so the document is not all boxes.
+
+"""
+
+
+async def _measure_loop_lag(stop: asyncio.Event, interval: float, samples: List[float]) -> None:
+    """Record how late each periodic wake-up fires; this is the loop's latency."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+def _lag_summary(samples: List[float]) -> str:
+    if not samples:
+        return "no samples"
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (f"p50={statistics.median(ordered) * 1000:7.2f}ms  "
+            f"p99={p99 * 1000:7.2f}ms  max={ordered[-1] * 1000:7.2f}ms  n={len(ordered)}")
+
+
+async def _bench_load(paths: List[Path], mode: str, max_concurrency: int) -> Tuple[List[float], float]:
+    samples: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_measure_loop_lag(stop, 0.005, samples))
+    start = time.perf_counter()
+    if mode == "blocking":
+        for path in paths:
+            content = _read_text(path)
+            apply_fixers(content)
+            await asyncio.sleep(0)
+    else:
+        async for _ in fix_paths_async(paths, max_concurrency=max_concurrency, write=False):
+            pass
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    return samples, elapsed
+
+
+def run_benchmark(file_counts=(10, 100, 500), repeat: int = 40, max_concurrency: int = DEFAULT_CONCURRENCY) -> None:
+    """Show that loop latency stays flat as load grows, unlike a blocking call."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        document = BENCH_DOCUMENT * repeat
+        paths = []
+        for i in range(max(file_counts)):
+            path = Path(temp_dir) / f"doc_{i:05d}.md"
+            path.write_text(document, encoding="utf-8")
+            paths.append(path)
+
+        print(f"Event-loop latency, {len(document)} chars per file, concurrency {max_concurrency}")
+        print("=" * 78)
+        for mode in ("blocking", "async"):
+            for count in file_counts:
+                samples, elapsed = asyncio.run(_bench_load(paths[:count], mode, max_concurrency))
+                print(f"{mode:>8} {count:5d} files {elapsed:7.2f}s  {_lag_summary(samples)}")
+
+
+def run_hook(stream=None, fixers: Tuple[str, ...] = DEFAULT_FIXERS) -> int:
+    """Post-write hook running the selected fixers through fix_pipeline. Returns the exit status.
+
+    One process, one read and at most one atomic write per edit, instead of
+    a hook per fixer.
+    """
+    return fix_pipeline.run_hook(stream, fix_pipeline.select_fixers(fixers))
+
+
+async def _fix_cli(paths: List[str], max_concurrency: int) -> int:
+    failures = 0
+    async for result in fix_paths_async(paths, max_concurrency=max_concurrency):
+        if result["error"]:
+            failures += 1
+            print(f"Error: {result['path']}: {result['error']}")
+        elif result["skipped"]:
+            print(f"Warning: left {result['path']} untouched: {result['skipped']}")
+        elif result["changed"]:
+            print(f"Fixed {result['path']} ({result['seconds'] * 1000:.1f}ms)")
+    return 1 if failures else 0
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fix diagrams and mermaid charts without blocking an event loop.")
+    parser.add_argument("paths", nargs="*", help="markdown files to fix in place")
+    parser.add_argument("--bench", action="store_true", help="run the event-loop latency benchmark")
+    parser.add_argument("--hook", action="store_true",
+                        help="read post-write hook JSON on stdin and fix the named file with every fixer")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"maximum files in flight (default {DEFAULT_CONCURRENCY})")
+    args = parser.parse_args()
+
+    if args.bench:
+        run_benchmark(max_concurrency=args.concurrency)
+        return 0
+    if args.hook:
+        return run_hook()
+    if not args.paths:
+        parser.print_usage()
+        return 1
+    return asyncio.run(_fix_cli(args.paths, args.concurrency))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
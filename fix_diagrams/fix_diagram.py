@@ -1,18 +1,184 @@
+import os
 import sys
+import json
+import time
 from typing import List, Tuple, Optional
 
-def find_all_boxes(lines: List[str]) -> List[dict]:
+# The fixer is reentrant: every function works on its own locals, never
+# mutates the lines or box dicts it is given, and there is no module-level
+# mutable state. Callers may run it from many threads at once.
+
+PROFILE_ENV_VAR = 'FIX_DIAGRAM_PROFILE'
+
+MAX_BOX_HEIGHT = 6  # Rows from top to bottom border; taller spans are overlapping boxes
+BOTTOM_SEARCH_WIDTH = 15  # Columns right of the top-left corner searched for '└'
+
+class Profile:
+    """Per-file phase timings and detection counters.
+
+    Profiling is opt-in: every function takes `profile=None` and only touches
+    the clock or the counters when a Profile is passed in.
+    """
+
+    def __init__(self, filename: Optional[str] = None):
+        self.filename = filename
+        self.phases = {}
+        self.counts = {'lines': 0, 'candidates': 0, 'accepted': 0, 'rejected': 0}
+        self.rejected = {}
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def reject(self, reason: str) -> None:
+        self.counts['rejected'] += 1
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def to_dict(self) -> dict:
+        record = {
+            'file': self.filename,
+            'phases_ms': {phase: round(seconds * 1000, 3) for phase, seconds in self.phases.items()},
+            'counts': dict(self.counts),
+            'rejected': dict(self.rejected),
+        }
+        try:
+            import resource
+            # ru_maxrss is reported in kilobytes on Linux
+            record['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            pass
+        return record
+
+DEFAULT_MAX_SECONDS = 2.0
+DEFAULT_MAX_CANDIDATES = 20000
+DEFAULT_MAX_MEMORY_MB = 256
+BUDGET_ENV_VARS = {
+    'max_seconds': 'FIX_DIAGRAM_MAX_SECONDS',
+    'max_candidates': 'FIX_DIAGRAM_MAX_CANDIDATES',
+    'max_memory_mb': 'FIX_DIAGRAM_MAX_MEMORY_MB',
+}
+
+class BudgetExceeded(Exception):
+    """Raised from inside detection when a per-file limit is exceeded."""
+
+    def __init__(self, limit: str, setting: str, used: float, allowed: float):
+        self.limit = limit
+        self.setting = setting
+        self.used = used
+        self.allowed = allowed
+        super().__init__(f"{limit} limit exceeded ({used:g} > {allowed:g})")
+
+    def __reduce__(self):
+        # Rebuild from the fields, so it survives the trip back from fix_async's process pool
+        return type(self), (self.limit, self.setting, self.used, self.allowed)
+
+def _current_rss_bytes() -> int:
+    """Resident set size of this process, falling back to the peak where /proc is missing."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return 0
+
+class Budget:
+    """Per-file limits on wall time, box candidates and memory growth.
+
+    Enforcement is cooperative: the detection and reconstruction loops call
+    `candidate()` and `tick()`, which raise BudgetExceeded once a limit is
+    passed. No signals or threads are involved, so it is safe when the fixer
+    is embedded in another program. Create one Budget per file; the clock and
+    the memory baseline start when it is constructed. A limit of None or 0
+    disables that check.
+    """
+
+    CHECK_EVERY = 256  # Loop iterations between clock and memory readings
+
+    def __init__(self, max_seconds: Optional[float] = DEFAULT_MAX_SECONDS,
+                 max_candidates: Optional[int] = DEFAULT_MAX_CANDIDATES,
+                 max_memory_mb: Optional[float] = DEFAULT_MAX_MEMORY_MB):
+        self.max_seconds = max_seconds or None
+        self.max_candidates = max_candidates or None
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        self.candidates = 0
+        self._ticks = 0
+        self._start = time.perf_counter()
+        self._baseline_rss = _current_rss_bytes() if self.max_memory_bytes else 0
+
+    @classmethod
+    def from_env(cls, **overrides) -> 'Budget':
+        """Build a budget from the FIX_DIAGRAM_MAX_* variables; explicit overrides win."""
+        limits = {}
+        for name, env_var in BUDGET_ENV_VARS.items():
+            value = overrides.get(name)
+            if value is None and os.environ.get(env_var):
+                value = float(os.environ[env_var])
+            if value is not None:
+                limits[name] = int(value) if name == 'max_candidates' else value
+        return cls(**limits)
+
+    def candidate(self) -> None:
+        """Count one '┌' candidate and check the limits."""
+        self.candidates += 1
+        if self.max_candidates is not None and self.candidates > self.max_candidates:
+            raise BudgetExceeded('candidate', 'max_candidates', self.candidates, self.max_candidates)
+        self.tick()
+
+    def tick(self) -> None:
+        """Mark one unit of loop work; every CHECK_EVERY ticks read the clock and memory."""
+        self._ticks += 1
+        if self._ticks % self.CHECK_EVERY == 0:
+            self.check()
+
+    def check(self) -> None:
+        if self.max_seconds is not None:
+            elapsed = time.perf_counter() - self._start
+            if elapsed > self.max_seconds:
+                raise BudgetExceeded('time', 'max_seconds', round(elapsed, 4), self.max_seconds)
+        if self.max_memory_bytes is not None:
+            grown = _current_rss_bytes() - self._baseline_rss
+            if grown > self.max_memory_bytes:
+                raise BudgetExceeded('memory', 'max_memory_mb', round(grown / (1024 * 1024), 1),
+                                     self.max_memory_bytes / (1024 * 1024))
+
+def _reject(profile: Optional[Profile], reason: str) -> None:
+    """Record why a candidate box was rejected; always returns None."""
+    if profile is not None:
+        profile.reject(reason)
+    return None
+
+def find_all_boxes(lines: List[str], profile: Optional[Profile] = None,
+                   budget: Optional[Budget] = None) -> List[dict]:
     """Find all boxes with improved multi-box handling."""
     boxes = []
+    seen = set()  # Corner keys of accepted boxes, see boxes_overlap_single
+    line_flags = {}  # Per-call memo of connector checks, see _line_connectors
 
     for i, line in enumerate(lines):
-        for j, char in enumerate(line):
-            if char == '┌':
-                box = find_complete_box(lines, i, j)
-                if box:
-                    # Check if this box overlaps with any existing box
-                    if not boxes_overlap(box, boxes):
-                        boxes.append(box)
+        j = line.find('┌')
+        while j != -1:
+            if budget is not None:
+                budget.candidate()
+            if profile is None:
+                box = find_complete_box(lines, i, j, budget=budget, line_flags=line_flags)
+            else:
+                profile.counts['candidates'] += 1
+                start = time.perf_counter()
+                box = find_complete_box(lines, i, j, profile, budget, line_flags)
+                profile.add_time('validate', time.perf_counter() - start)
+            if box:
+                # Check if this box overlaps with any existing box
+                key = (box['top'], box['bottom'], box['left'], box['right_top'])
+                if key not in seen:
+                    seen.add(key)
+                    boxes.append(box)
+                    if profile is not None:
+                        profile.counts['accepted'] += 1
+                else:
+                    _reject(profile, 'duplicate')
+            j = line.find('┌', j + 1)
 
     return boxes
 
@@ -32,19 +198,42 @@ def boxes_overlap_single(box1: dict, box2: dict) -> bool:
             box1['left'] == box2['left'] and
             box1['right_top'] == box2['right_top'])
 
-def find_complete_box(lines: List[str], start_row: int, start_col: int) -> Optional[dict]:
+def _line_connectors(lines: List[str], row: int, line_flags: Optional[dict]) -> Tuple[bool, bool]:
+    """Return (has vertical arrow, has several horizontal arrows) for a line.
+
+    Both checks scan the whole line, so find_all_boxes passes a memo to keep
+    a long line of many boxes from being rescanned once per box.
+    """
+    if line_flags is not None and row in line_flags:
+        return line_flags[row]
+    line = lines[row]
+    flags = ('▼' in line or '▲' in line,
+             line.count('────▶') > 1 or line.count('◀────') > 1)
+    if line_flags is not None:
+        line_flags[row] = flags
+    return flags
+
+def find_complete_box(lines: List[str], start_row: int, start_col: int,
+                      profile: Optional[Profile] = None,
+                      budget: Optional[Budget] = None,
+                      line_flags: Optional[dict] = None) -> Optional[dict]:
     """Find complete box with improved boundary detection."""
     # Find top-right corner
     top_line = lines[start_row]
     top_right_col = top_line.find('┐', start_col)
     if top_right_col == -1:
-        return None
+        return _reject(profile, 'no_top_right')
 
     # Find bottom-left corner - look in a wider range and be more flexible
     bottom_row = None
     bottom_left_col = None
 
-    for row in range(start_row + 1, len(lines)):
+    # Only rows within MAX_BOX_HEIGHT can close a box (taller spans are
+    # overlapping boxes), so the search stops there instead of scanning to
+    # the end of the document for every candidate
+    for row in range(start_row + 1, min(len(lines), start_row + MAX_BOX_HEIGHT + 1)):
+        if budget is not None:
+            budget.tick()
         line = lines[row]
         # First check the exact same column
         if start_col < len(line) and line[start_col] == '└':
@@ -52,26 +241,28 @@ def find_complete_box(lines: List[str], start_row: int, start_col: int) -> Optio
             bottom_left_col = start_col
             break
         # Then look in a wider range for the bottom-left corner
-        for col in range(max(0, start_col), min(len(line), start_col + 15)):  # Search forward more
-            if line[col] == '└':
-                # Check if this could be a valid bottom-left for this box
-                # by looking for a corresponding bottom-right corner
-                potential_bottom_right = line.find('┘', col)
-                if potential_bottom_right != -1:
-                    # Calculate expected width based on top border
-                    expected_width = top_right_col - start_col + 1
-                    actual_width = potential_bottom_right - col + 1
-
-                    # If widths are similar (within tolerance), accept this as the box
-                    if abs(expected_width - actual_width) <= 10:  # Increased tolerance
-                        bottom_row = row
-                        bottom_left_col = col
-                        break
+        window_end = min(len(line), start_col + BOTTOM_SEARCH_WIDTH)  # Search forward more
+        col = line.find('└', start_col, window_end)
+        while col != -1:
+            # Check if this could be a valid bottom-left for this box
+            # by looking for a corresponding bottom-right corner
+            potential_bottom_right = line.find('┘', col)
+            if potential_bottom_right != -1:
+                # Calculate expected width based on top border
+                expected_width = top_right_col - start_col + 1
+                actual_width = potential_bottom_right - col + 1
+
+                # If widths are similar (within tolerance), accept this as the box
+                if abs(expected_width - actual_width) <= 10:  # Increased tolerance
+                    bottom_row = row
+                    bottom_left_col = col
+                    break
+            col = line.find('└', col + 1, window_end)
         if bottom_row is not None:
             break
 
     if bottom_row is None:
-        return None
+        return _reject(profile, 'no_bottom_left')
 
     # Find bottom-right corner
     bottom_line = lines[bottom_row]
@@ -79,40 +270,29 @@ def find_complete_box(lines: List[str], start_row: int, start_col: int) -> Optio
     if bottom_right_col == -1:
         bottom_right_col = bottom_line.find('┘', bottom_left_col)
     if bottom_right_col == -1:
-        return None
-
-    # Additional validation to prevent false positives in vertical arrow scenarios
-    # Check if box spans too many lines (likely overlapping boxes with arrows)
-    box_height = bottom_row - start_row
-    if box_height > 6:  # More than 6 lines suggests overlapping boxes
-        return None
+        return _reject(profile, 'no_bottom_right')
 
     # Check if box area contains arrow connectors (suggests separate connected boxes)
     for row in range(start_row, bottom_row + 1):
-        line = lines[row]
-        if '▼' in line or '▲' in line:
-            return None  # Arrow connectors suggest separate boxes, not one large box
+        if _line_connectors(lines, row, line_flags)[0]:
+            return _reject(profile, 'vertical_arrows')  # Arrow connectors suggest separate boxes, not one large box
 
     # Additional check for horizontal arrows in multi-row scenarios
     # Check if box area contains horizontal arrow patterns (suggesting separate connected boxes)
     for row in range(start_row, bottom_row + 1):
-        line = lines[row]
         # Look for patterns with multiple arrows suggesting multiple connected boxes
-        if line.count('────▶') > 1 or line.count('◀────') > 1:
-            return None  # Multiple horizontal arrows suggest separate boxes, not one large box
+        if _line_connectors(lines, row, line_flags)[1]:
+            return _reject(profile, 'horizontal_arrows')  # Multiple horizontal arrows suggest separate boxes, not one large box
 
     # Check for incomplete box patterns that suggest separate structures
     # Look for multiple top corners without corresponding bottom corners in the same columns
     top_corners_in_box = 0
     for row in range(start_row, bottom_row + 1):
-        line = lines[row]
-        for col in range(start_col, top_right_col + 1):
-            if col < len(line) and line[col] == '┌':
-                top_corners_in_box += 1
+        top_corners_in_box += lines[row].count('┌', start_col, top_right_col + 1)
 
     # If we find multiple top corners, this suggests multiple boxes shouldn't be merged
     if top_corners_in_box > 1:
-        return None  # Multiple top corners suggest separate incomplete/complete boxes
+        return _reject(profile, 'nested_top_corners')  # Multiple top corners suggest separate incomplete/complete boxes
 
     return {
         'top': start_row,
@@ -149,14 +329,149 @@ def calculate_box_width_improved(box: dict, lines: List[str]) -> int:
 
     return max(max_content_width, top_width, bottom_width)
 
-def fix_diagram_improved(text: str) -> str:
-    """Fix all boxes in a diagram with improved multi-box handling."""
+def with_corrections(box: dict) -> dict:
+    """Return a copy of box annotated with its corrected geometry.
+
+    The caller's dict is left untouched so detected boxes can be shared
+    between threads or reused across calls.
+    """
+    # Use the top border width as the correct width for this box
+    top_width = box['right_top'] - box['left'] + 1
+    corrected = dict(box)
+    corrected['correct_width'] = top_width
+    # Store the correct right position based on top border
+    corrected['right_correct'] = box['right_top']
+    # Bottom border doesn't match top border width - need to fix during reconstruction
+    corrected['bottom_needs_fix'] = box['right_bottom'] - box['left'] + 1 != top_width
+    return corrected
+
+def fix_diagram_improved(text: str, profile: Optional[Profile] = None,
+                         budget: Optional[Budget] = None) -> str:
+    """Fix all boxes in a diagram with improved multi-box handling.
+
+    With a budget, raises BudgetExceeded instead of running past its limits;
+    the text is not modified in that case.
+    """
+    if '┌' not in text:
+        return text
+
     lines = text.split('\n')
-    boxes = find_all_boxes(lines)
+    if profile is None:
+        boxes = find_all_boxes(lines, budget=budget)
+    else:
+        profile.counts['lines'] += len(lines)
+        start = time.perf_counter()
+        boxes = find_all_boxes(lines, profile, budget)
+        profile.add_time('detect', time.perf_counter() - start)
 
     if not boxes:
         return text
 
+    # Most documents were fixed on an earlier write; hand those back untouched
+    if profile is None:
+        if boxes_aligned(lines, boxes):
+            return text
+    else:
+        start = time.perf_counter()
+        aligned = boxes_aligned(lines, boxes)
+        profile.add_time('check_aligned', time.perf_counter() - start)
+        if aligned:
+            profile.counts['already_aligned'] = 1
+            return text
+
+    if profile is None:
+        return fix_boxes(lines, boxes, budget)
+    start = time.perf_counter()
+    fixed = fix_boxes(lines, boxes, budget)
+    profile.add_time('reconstruct', time.perf_counter() - start)
+    return fixed
+
+def fix_diagram_text(text: str, profile: Optional[Profile] = None,
+                     budget: Optional[Budget] = None) -> str:
+    """fix_diagram_improved for text read with newline='': CRLF text is fixed as LF and converted back.
+
+    Returns text itself when nothing changed, so callers can skip the write.
+    """
+    if '\r\n' not in text:
+        return fix_diagram_improved(text, profile, budget)
+    lf_text = text.replace('\r\n', '\n')
+    fixed = fix_diagram_improved(lf_text, profile, budget)
+    return text if fixed == lf_text else fixed.replace('\n', '\r\n')
+
+def _contains_any(text: str, chars: str) -> bool:
+    # One substring search per character beats a Python loop over the text
+    for c in chars:
+        if c in text:
+            return True
+    return False
+
+def boxes_aligned(lines: List[str], boxes: List[dict]) -> bool:
+    """Check, without rebuilding anything, that fix_boxes would leave every line as it is.
+
+    Each box needs plain top and bottom borders as wide as each other and a
+    '│' at both edges of every content row. The multi-box path also needs
+    nothing between boxes that its arrow and stray-border clean-up would
+    rewrite. Anything unusual returns False and gets the full fix.
+    """
+    if len(boxes) == 1:
+        box = boxes[0]
+        left, right = box['left'], box['right_top']
+        if box['right_bottom'] != right:
+            return False
+        border = '─' * (right - left - 1)
+        if lines[box['top']][left:right + 1] != '┌' + border + '┐':
+            return False
+        bottom_line = lines[box['bottom']]
+        if bottom_line[left:right + 1] != '└' + border + '┘' or bottom_line.find('┘', left) != right:
+            return False
+        for row in range(box['top'] + 1, box['bottom']):
+            line = lines[row]
+            if line[left:left + 1] != '│' or line.rfind('│', left) != right:
+                return False
+        return True
+
+    boxes_by_line = {}
+    for box in boxes:
+        if box['right_bottom'] != box['right_top']:
+            return False
+        for line_num in range(box['top'], box['bottom'] + 1):
+            boxes_by_line.setdefault(line_num, []).append(box)
+
+    for line_num, boxes_on_line in boxes_by_line.items():
+        line = lines[line_num]
+        last_pos = 0
+        is_bottom_line = False
+        if len(boxes_on_line) > 1:
+            boxes_on_line.sort(key=lambda b: b['left'])
+        for box in boxes_on_line:
+            left, right = box['left'], box['right_top']
+            if left < last_pos:
+                return False  # Overlapping boxes are rebuilt, not copied
+            if line_num != box['top'] and last_pos < left:
+                top_gap = lines[box['top']][last_pos:left]
+                if _contains_any(top_gap, '▶◀←→'):
+                    return False
+                if line_num == box['bottom'] and _contains_any(line[last_pos:left], '└─┘▶◀←→'):
+                    return False
+            if line_num == box['bottom']:
+                is_bottom_line = True
+                if line[left:right + 1] != '└' + '─' * (right - left - 1) + '┘':
+                    return False
+            elif line_num != box['top']:
+                if line[left:left + 1] != '│' or line.find('│', left + 1) != right:
+                    return False
+            last_pos = right + 1
+        remaining = line[last_pos:]
+        if is_bottom_line and _contains_any(remaining, '└─┘'):
+            return False
+        if not is_bottom_line and len(boxes_on_line) > 1 and remaining == '│':
+            return False
+    return True
+
+def fix_boxes(lines: List[str], boxes: List[dict], budget: Optional[Budget] = None) -> str:
+    """Rebuild the lines touched by the detected boxes and join the result."""
+    lines = list(lines)
+
     # CORE FUNCTIONALITY: Simple single box fix
     if len(boxes) == 1:
         box = boxes[0]
@@ -230,24 +545,20 @@ def fix_diagram_improved(text: str) -> str:
         return '\n'.join(lines)
 
     # Calculate individual box widths based on top borders (authoritative source)
+    boxes = [with_corrections(box) for box in boxes]
+
+    # Bucket boxes by the rows they span, keeping detection order within a row
+    boxes_by_line = {}
     for box in boxes:
-        # Use the top border width as the correct width for this box
-        top_width = box['right_top'] - box['left'] + 1
-        box['correct_width'] = top_width
-        # Store the correct right position based on top border
-        box['right_correct'] = box['right_top']
-
-        # Validate and fix bottom border alignment issues
-        if box['right_bottom'] - box['left'] + 1 != top_width:
-            # Bottom border doesn't match top border width - need to fix during reconstruction
-            box['bottom_needs_fix'] = True
-        else:
-            box['bottom_needs_fix'] = False
+        for line_num in range(box['top'], box['bottom'] + 1):
+            boxes_by_line.setdefault(line_num, []).append(box)
 
     # Process each line
     fixed_lines = []
     for line_num, original_line in enumerate(lines):
-        boxes_on_line = [box for box in boxes if box['top'] <= line_num <= box['bottom']]
+        if budget is not None:
+            budget.tick()
+        boxes_on_line = boxes_by_line.get(line_num)
 
         if not boxes_on_line:
             fixed_lines.append(original_line)
@@ -264,6 +575,7 @@ def fix_diagram_improved(text: str) -> str:
 
 def reconstruct_line_corrected(original_line: str, boxes_on_line: List[dict], line_num: int, all_lines: List[str]) -> str:
     """Reconstruct a line with individually corrected boxes, preserving content between them."""
+    boxes_on_line = [box if 'correct_width' in box else with_corrections(box) for box in boxes_on_line]
     result = ""
     last_pos = 0
 
@@ -416,29 +728,10 @@ def extract_content_preserved(line: str, box: dict, all_lines: List[str], line_n
     """Extract content from a box line while preserving original content exactly."""
     left_col = box['left']
 
-    # Find all pipe positions in the line
-    pipe_positions = []
-    for i, char in enumerate(line):
-        if char == '│':
-            pipe_positions.append(i)
-
-    # Find the pipes that bound this specific box
-    left_pipe = -1
-    right_pipe = -1
-
-    for i, pipe_pos in enumerate(pipe_positions):
-        if pipe_pos >= left_col:
-            # Find the first pipe at or after left_col, and the next pipe after that
-            if i == len(pipe_positions) - 1:
-                # Last pipe in the line
-                left_pipe = pipe_pos
-                break
-            elif i < len(pipe_positions) - 1:
-                next_pipe_pos = pipe_positions[i + 1]
-                if next_pipe_pos > pipe_pos:
-                    left_pipe = pipe_pos
-                    right_pipe = next_pipe_pos
-                    break
+    # Find the pipes that bound this specific box: the first pipe at or
+    # after left_col, and the next pipe after that
+    left_pipe = line.find('│', left_col)
+    right_pipe = line.find('│', left_pipe + 1) if left_pipe != -1 else -1
 
     # Extract content between the found pipes
     if left_pipe != -1 and right_pipe != -1 and right_pipe > left_pipe:
@@ -479,21 +772,343 @@ def extract_content_improved(line: str, box: dict) -> str:
 
     return content.rstrip('│─└┘┌┐')
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python fix_diagram.py <filename>")
-        sys.exit(1)
+def emit_profile(profile: Profile, destination: str) -> None:
+    """Write one JSON line for the profiled file to stderr ('-') or append it to a file."""
+    line = json.dumps(profile.to_dict(), ensure_ascii=False)
+    if destination == '-':
+        print(line, file=sys.stderr)
+    else:
+        with open(destination, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+def profile_destination(cli_value: Optional[str]) -> Optional[str]:
+    """Resolve where profile records go: --profile wins over the environment.
+
+    FIX_DIAGRAM_PROFILE=1 (or '-') sends records to stderr; any other value
+    is taken as a JSONL file to append to, which is how traces are collected
+    from the hook.
+    """
+    value = cli_value if cli_value is not None else os.environ.get(PROFILE_ENV_VAR)
+    if not value or value == '0':
+        return None
+    if value in ('1', '-', 'stderr'):
+        return '-'
+    return value
+
+# ---------------------------------------------------------------------------
+# Watch mode
+# ---------------------------------------------------------------------------
+
+WATCH_DEBOUNCE = 0.25  # Seconds a file must stay quiet before it is fixed
+WATCH_POLL_INTERVAL = 1.0  # Seconds between scans when inotify is unavailable
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+
+def _is_watched_file(path: str) -> bool:
+    # Hidden names cover editor swap files and our own temporary files
+    name = os.path.basename(path)
+    return name.endswith('.md') and not name.startswith('.')
+
+def _markdown_files(root: str) -> List[str]:
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        found.extend(os.path.join(dirpath, name) for name in filenames if _is_watched_file(name))
+    return found
+
+class InotifyWatcher:
+    """Recursive inotify watch on a directory tree, via ctypes (Linux only).
+
+    Only close-after-write and rename-into events are used, so an editor
+    save is one event however many write() calls it made. Blocking in
+    poll() between events keeps an idle watcher at zero CPU.
+    """
+
+    def __init__(self, root: str):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError("inotify is not available on this platform")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}  # watch descriptor -> directory path
+        self.add_tree(root)
+
+    def add_tree(self, root: str) -> List[str]:
+        """Watch root and every directory below it; return the .md files already there."""
+        import ctypes
+
+        found = []
+        stack = [root]
+        while stack:
+            dirpath = stack.pop()
+            # Watch first, then list, so a file created in between is seen by one or the other
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd < 0:
+                print(f"Warning: cannot watch {dirpath}: {os.strerror(ctypes.get_errno())}", file=sys.stderr)
+                continue
+            self._dirs[wd] = dirpath
+            try:
+                entries = list(os.scandir(dirpath))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.'):
+                        stack.append(entry.path)
+                elif _is_watched_file(entry.name):
+                    found.append(entry.path)
+        return found
+
+    def read_events(self) -> Tuple[List[str], bool]:
+        """Drain the queue; return (changed .md paths, whether events were lost)."""
+        import struct
+
+        paths, overflowed = [], False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return paths, overflowed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = struct.unpack_from('iIII', data, offset)
+                name = data[offset + 16:offset + 16 + length].rstrip(b'\0')
+                offset += 16 + length
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                    continue
+                directory = self._dirs.get(wd)
+                if mask & (IN_IGNORED | IN_DELETE_SELF):
+                    self._dirs.pop(wd, None)
+                    continue
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not os.path.basename(path).startswith('.'):
+                        # Files may land in a new directory before its watch exists
+                        paths.extend(self.add_tree(path))
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and _is_watched_file(path):
+                    paths.append(path)
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+def watch_batches(root: str, debounce: float = WATCH_DEBOUNCE):
+    """Yield sets of .md paths under root once each has been quiet for `debounce` seconds.
+
+    Rapid saves of one file coalesce into a single entry. Uses inotify
+    where available and falls back to polling modification times.
+    """
+    import select
+
+    try:
+        watcher = InotifyWatcher(root)
+    except OSError as e:
+        print(f"Warning: {e}; polling every {WATCH_POLL_INTERVAL:g}s instead", file=sys.stderr)
+        yield from _poll_batches(root, debounce)
+        return
+
+    pending = {}  # path -> time of its latest event
+    poller = select.poll()
+    poller.register(watcher.fd, select.POLLIN)
+    try:
+        while True:
+            if pending:
+                wait = max(0.0, min(pending.values()) + debounce - time.monotonic())
+                poller.poll(wait * 1000)
+            else:
+                poller.poll()  # Sleep until the kernel has something for us
+            paths, overflowed = watcher.read_events()
+            now = time.monotonic()
+            if overflowed:
+                # The kernel dropped events; rescan rather than miss a change
+                paths.extend(_markdown_files(root))
+            for path in paths:
+                pending[path] = now
+            ready = {path for path, last in pending.items() if now - last >= debounce}
+            if ready:
+                for path in ready:
+                    del pending[path]
+                yield ready
+    finally:
+        watcher.close()
+
+def _poll_batches(root: str, debounce: float):
+    def snapshot() -> dict:
+        state = {}
+        for path in _markdown_files(root):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            state[path] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    known = snapshot()
+    while True:
+        time.sleep(max(WATCH_POLL_INTERVAL, debounce))
+        current = snapshot()
+        changed = {path for path, signature in current.items() if known.get(path) != signature}
+        known = current
+        if changed:
+            yield changed
+
+def _file_signature(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def fix_watched_file(path: str, own_writes: dict, **limits) -> Optional[str]:
+    """Fix one changed file in place; return a status line, or None if there was nothing to do.
 
-    filename = sys.argv[1]
+    `own_writes` maps paths to the signature of the file this process
+    last wrote, so the event caused by that write is recognised and skipped.
+    `limits` are Budget.from_env overrides.
+    """
+    signature = _file_signature(path)
+    if signature is None:
+        return None
+    if own_writes.pop(path, None) == signature:
+        return None  # The event for our own write
 
+    start = time.perf_counter()
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
+        # newline='' keeps CRLF files byte for byte outside the fixed boxes
+        with open(path, 'r', encoding='utf-8', newline='') as f:
             content = f.read()
+        fixed_content = fix_diagram_text(content, budget=Budget.from_env(**limits))
+    except BudgetExceeded as e:
+        return f"Warning: left {path} untouched: {e}"
+    except (OSError, UnicodeDecodeError) as e:
+        return f"Error: {path}: {e}"
+    if fixed_content is content:
+        return None
 
-        fixed_content = fix_diagram_improved(content)
+    from atomic_write import write_text_atomic  # Imported on first use, so the hook path never loads it
+    try:
+        # A save made while we were fixing has its own event; leave that version alone
+        if not write_text_atomic(path, fixed_content, lambda: _file_signature(path) == signature):
+            return None
+    except OSError as e:
+        return f"Error: {path}: {e}"
+    own_writes[path] = _file_signature(path)
+    return f"Fixed {path} ({(time.perf_counter() - start) * 1000:.1f}ms)"
+
+def watch(root: str, debounce: float = WATCH_DEBOUNCE, **limits) -> None:
+    """Fix .md files under root as they change, until interrupted.
+
+    The fixer stays imported and warm, so each save costs only the fix
+    itself rather than an interpreter start.
+    """
+    own_writes = {}
+    fixed = 0
+    print(f"Watching {root} for .md changes (Ctrl-C to stop)")
+    try:
+        for batch in watch_batches(root, debounce):
+            for path in sorted(batch):
+                status = fix_watched_file(path, own_writes, **limits)
+                if status:
+                    fixed += status.startswith('Fixed')
+                    print(status, flush=True)
+    except KeyboardInterrupt:
+        print(f"\nStopped watching {root}; fixed {fixed} files")
 
-        with open(filename, 'w', encoding='utf-8') as f:
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fix misaligned box diagrams in a markdown file in place.")
+    parser.add_argument('filename', nargs='?')
+    parser.add_argument('--watch', metavar='DIR',
+                        help="keep running and fix .md files under DIR whenever they are saved")
+    parser.add_argument('--debounce', type=float, default=WATCH_DEBOUNCE,
+                        help=f"with --watch, seconds a file must be quiet before it is fixed (default {WATCH_DEBOUNCE:g})")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"print per-phase timings and counts as a JSON line on stderr "
+                             f"(also enabled by {PROFILE_ENV_VAR})")
+    parser.add_argument('--profile-file', metavar='JSONL',
+                        help="append the profile JSON line to JSONL instead of stderr")
+    parser.add_argument('--max-seconds', type=float,
+                        help=f"per-file wall time limit, 0 disables (default {DEFAULT_MAX_SECONDS:g}, "
+                             f"env {BUDGET_ENV_VARS['max_seconds']})")
+    parser.add_argument('--max-candidates', type=int,
+                        help=f"per-file limit on '┌' candidates, 0 disables (default {DEFAULT_MAX_CANDIDATES}, "
+                             f"env {BUDGET_ENV_VARS['max_candidates']})")
+    parser.add_argument('--max-memory-mb', type=float,
+                        help=f"per-file limit on memory growth, 0 disables (default {DEFAULT_MAX_MEMORY_MB}, "
+                             f"env {BUDGET_ENV_VARS['max_memory_mb']})")
+    args = parser.parse_args()
+
+    if args.watch:
+        if args.filename:
+            parser.error("give either a filename or --watch DIR, not both")
+        if not os.path.isdir(args.watch):
+            print(f"Error: '{args.watch}' is not a directory")
+            sys.exit(1)
+        watch(args.watch, args.debounce, max_seconds=args.max_seconds,
+              max_candidates=args.max_candidates, max_memory_mb=args.max_memory_mb)
+        return
+    if not args.filename:
+        parser.error("a filename or --watch DIR is required")
+
+    filename = args.filename
+    destination = profile_destination(args.profile_file or ('-' if args.profile else None))
+    profile = Profile(filename) if destination else None
+
+    try:
+        budget = Budget.from_env(max_seconds=args.max_seconds,
+                                 max_candidates=args.max_candidates,
+                                 max_memory_mb=args.max_memory_mb)
+        start = time.perf_counter()
+        with open(filename, 'r', encoding='utf-8', newline='') as f:
+            content = f.read()
+        if profile is not None:
+            profile.add_time('read', time.perf_counter() - start)
+            profile.counts['bytes'] = len(content.encode('utf-8'))
+
+        try:
+            fixed_content = fix_diagram_text(content, profile, budget)
+        except BudgetExceeded as e:
+            # Leave the file exactly as it was; a slow hook is worse than a crooked box
+            print(f"Warning: left {filename} untouched: {e}. "
+                  f"Raise {BUDGET_ENV_VARS[e.setting]} to allow more.", file=sys.stderr)
+            if profile is not None:
+                profile.counts['budget_exceeded'] = e.limit
+                profile.add_time('total', time.perf_counter() - start)
+                emit_profile(profile, destination)
+            return
+
+        if fixed_content is content:
+            # Already aligned: skip the write so the file and its mtime stay as they were
+            if profile is not None:
+                profile.add_time('total', time.perf_counter() - start)
+                emit_profile(profile, destination)
+            print(f"Diagrams already aligned in {filename}")
+            return
+
+        write_start = time.perf_counter()
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
             f.write(fixed_content)
+        if profile is not None:
+            profile.add_time('write', time.perf_counter() - write_start)
+            profile.add_time('total', time.perf_counter() - start)
+            emit_profile(profile, destination)
 
         print(f"Successfully fixed diagrams in {filename}")
 
@@ -505,4 +1120,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
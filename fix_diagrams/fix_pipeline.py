@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Single-read pipeline running the box and mermaid fixers over a document.
+
+A file is read once and cut into segments: the body of every fenced code
+block, tagged with its language (the first word of the info string, ''
+for a bare fence), and the text around them, tagged None. Each segment
+goes through every fixer that accepts its language, in order. A fixer
+registered with document=True sees the whole text instead, once; the box
+fixer does, because which boxes it pairs up depends on everything around
+them, and the pipeline must give the same result as fix_diagram.py. A
+fixer's hint is a cheap test on the whole document; a fixer whose hint
+fails is left out, and a document no fixer wants is never segmented. The
+pieces are joined and the file is written once, atomically, and only if
+a fixer changed something.
+
+Fixers are plain dicts in FIXERS, so later ones plug into the same
+segment stream:
+
+    register_fixer("tables", accepts=lambda language: language is None,
+                   hint=lambda text: "|-" in text, fix=lambda text, budget: align(text))
+
+fix is called as fix(text, budget) and returns the text itself when it
+has nothing to do. The budget is one fix_diagram.Budget per file, shared
+by every segment.
+
+Usage:
+    python3 fix_pipeline.py file.md [docs/ ...]     # fix in place
+    python3 fix_pipeline.py --check docs/           # exit 1 if any file would change
+    python3 fix_pipeline.py --timings docs/         # per-fixer time and counts
+    python3 fix_pipeline.py --hook < hook.json      # post-write hook for both fixers
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import fix_diagram
+from atomic_write import write_text_atomic
+
+try:
+    import fix_mermaid
+except ImportError:
+    # Repository layout: fix_mermaid/ sits next to fix_diagrams/
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fix_mermaid"))
+    import fix_mermaid
+
+FIXERS: List[dict] = []
+
+
+def register_fixer(name: str, accepts: Callable[[Optional[str]], bool],
+                   fix: Callable[[str, Optional[fix_diagram.Budget]], str],
+                   hint: Optional[Callable[[str], bool]] = None, document: bool = False) -> dict:
+    """Add a fixer to the end of the pipeline and return its entry.
+
+    accepts(language) picks the segments it sees: None for text outside
+    fences, '' for a bare fence, else the fence's language. A document
+    fixer is called once on the whole text and accepts is not consulted.
+    Registering a name again replaces that fixer where it stands.
+    """
+    fixer = {"name": name, "accepts": accepts, "fix": fix, "hint": hint or (lambda text: True),
+             "document": document}
+    for index, existing in enumerate(FIXERS):
+        if existing["name"] == name:
+            FIXERS[index] = fixer
+            break
+    else:
+        FIXERS.append(fixer)
+    return fixer
+
+
+def select_fixers(names) -> List[dict]:
+    """The registered fixers with the given names, in pipeline order; ValueError for an unknown name."""
+    names = tuple(names)
+    known = {fixer["name"] for fixer in FIXERS}
+    for name in names:
+        if name not in known:
+            raise ValueError(f"Unknown fixer: {name}")
+    return [fixer for fixer in FIXERS if fixer["name"] in names]
+
+
+register_fixer("diagram", accepts=lambda language: True,
+               fix=lambda text, budget: fix_diagram.fix_diagram_text(text, None, budget),
+               hint=lambda text: "┌" in text, document=True)
+register_fixer("mermaid", accepts=lambda language: language == "mermaid",
+               fix=lambda text, budget: fix_mermaid.fix_mermaid_chart(text),
+               hint=fix_mermaid.might_contain_chart)
+
+
+def iter_segments(content: str) -> Iterator[Tuple[int, int, Optional[str]]]:
+    """Yield (start, end, language) covering content: fence bodies and the text between them."""
+    position = 0
+    for start, end, language in fix_mermaid.iter_fenced_blocks(content):
+        if start > position:
+            yield position, start, None
+        yield start, end, language
+        position = end
+    if position < len(content):
+        yield position, len(content), None
+
+
+def new_report(fixers: Optional[List[dict]] = None) -> Dict:
+    """Counters for run_pipeline(): per fixer, segments fixed and changed, and seconds spent."""
+    return {"segments": 0, "fixers": {fixer["name"]: {"segments": 0, "changed": 0, "seconds": 0.0}
+                                      for fixer in (FIXERS if fixers is None else fixers)}}
+
+
+def _fix_segments(content: str, fixers: List[dict], budget: Optional[fix_diagram.Budget],
+                  report: Dict) -> str:
+    """One segmenting pass with a run of per-segment fixers; returns content itself if nothing changed."""
+    pieces = []
+    copied = 0
+    for start, end, language in iter_segments(content):
+        report["segments"] += 1
+        segment = content[start:end]
+        fixed = segment
+        for fixer in fixers:
+            if not fixer["accepts"](language):
+                continue
+            fixed = _apply(fixer, fixed, budget, report)
+        if fixed is not segment:
+            pieces.append(content[copied:start])
+            pieces.append(fixed)
+            copied = end
+    if not pieces:
+        return content
+    pieces.append(content[copied:])
+    return "".join(pieces)
+
+
+def _apply(fixer: dict, text: str, budget: Optional[fix_diagram.Budget], report: Dict) -> str:
+    counts = report["fixers"][fixer["name"]]
+    began = time.perf_counter()
+    result = fixer["fix"](text, budget)
+    counts["seconds"] += time.perf_counter() - began
+    counts["segments"] += 1
+    if result == text:
+        return text
+    counts["changed"] += 1
+    return result
+
+
+def run_pipeline(content: str, fixers: Optional[List[dict]] = None,
+                 budget: Optional[fix_diagram.Budget] = None, report: Optional[Dict] = None) -> str:
+    """Run the fixers over content in order; returns content itself if nothing changed.
+
+    Consecutive per-segment fixers share one segmenting pass; a document
+    fixer runs on the whole text where it stands in the order. Raises
+    fix_diagram.BudgetExceeded when the budget runs out, before anything
+    is returned, so a caller never writes a half-fixed file.
+    """
+    fixers = FIXERS if fixers is None else fixers
+    if report is None:
+        report = new_report(fixers)
+    # Most documents hold nothing any fixer wants; skip segmenting them
+    active = [fixer for fixer in fixers if fixer["hint"](content)]
+    text = content
+    run: List[dict] = []
+    for fixer in active + [None]:
+        if fixer is not None and not fixer["document"]:
+            run.append(fixer)
+            continue
+        if run:
+            text = _fix_segments(text, run, budget, report)
+            run = []
+        if fixer is not None:
+            text = _apply(fixer, text, budget, report)
+    return content if text == content else text
+
+
+def fix_file(path, write: bool = True, fixers: Optional[List[dict]] = None,
+             budget: Optional[fix_diagram.Budget] = None) -> dict:
+    """Read a file once, fix it, and write it back once if it changed.
+
+    Returns a result dict: 'path', 'changed', 'error' (None on success),
+    'skipped' (the BudgetExceeded message when the file was left alone),
+    'read_seconds', 'write_seconds' and the pipeline 'report'.
+    """
+    report = new_report(fixers)
+    result = {"path": str(path), "changed": False, "error": None, "skipped": None,
+              "read_seconds": 0.0, "write_seconds": 0.0, "report": report}
+    try:
+        began = time.perf_counter()
+        # newline='' keeps CRLF files byte for byte outside the fixed segments
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            content = f.read()
+        result["read_seconds"] = time.perf_counter() - began
+        fixed = run_pipeline(content, fixers, budget if budget is not None else fix_diagram.Budget.from_env(),
+                             report)
+        if fixed is not content:
+            result["changed"] = True
+            if write:
+                began = time.perf_counter()
+                write_text_atomic(path, fixed)
+                result["write_seconds"] = time.perf_counter() - began
+    except fix_diagram.BudgetExceeded as e:
+        # Same policy as fix_diagram.py: a slow hook is worse than a crooked box
+        result["skipped"] = f"{e}. Raise {fix_diagram.BUDGET_ENV_VARS[e.setting]} to allow more."
+    except (OSError, UnicodeDecodeError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def format_report(result: dict) -> str:
+    """One line per fixer with its counts and time, after a read/write line."""
+    lines = [f"  read {result['read_seconds'] * 1000:.2f}ms, write {result['write_seconds'] * 1000:.2f}ms, "
+             f"{result['report']['segments']} segments"]
+    for name, counts in result["report"]["fixers"].items():
+        lines.append(f"  {name:<10} {counts['segments']:5d} segments {counts['changed']:5d} changed "
+                     f"{counts['seconds'] * 1000:9.2f}ms")
+    return "\n".join(lines)
+
+
+def run_hook(stream=None, fixers: Optional[List[dict]] = None) -> int:
+    """Post-write hook: one read and at most one atomic write of the edited file. Returns the exit status."""
+    try:
+        path = fix_mermaid.read_hook_path(stream or sys.stdin)
+    except ValueError as e:
+        print(f"fix_pipeline hook: input is not hook JSON: {e}", file=sys.stderr)
+        return 1
+    if path is None:
+        return 0
+    result = fix_file(path, fixers=fixers)
+    if result["error"]:
+        print(f"fix_pipeline hook: {path}: {result['error']}", file=sys.stderr)
+        return 1
+    if result["skipped"]:
+        print(f"Warning: left {path} untouched: {result['skipped']}", file=sys.stderr)
+    elif result["changed"]:
+        print(f"Fixed {path}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fix box diagrams and mermaid charts with one read and one write per file.")
+    parser.add_argument("paths", nargs="*", help="markdown files, or directories to search recursively")
+    parser.add_argument("--check", action="store_true", help="report files that would change, write nothing, exit 1 if any")
+    parser.add_argument("--timings", action="store_true", help="print per-fixer counts and time for every file")
+    parser.add_argument("--hook", action="store_true",
+                        help="read post-write hook JSON on stdin and fix the named file")
+    args = parser.parse_args(argv)
+
+    if args.hook:
+        return run_hook()
+    if not args.paths:
+        parser.print_usage()
+        return 1
+
+    failures = changed = files = 0
+    for path in fix_mermaid.iter_markdown_files(args.paths):
+        files += 1
+        result = fix_file(path, write=not args.check)
+        if result["error"]:
+            failures += 1
+            print(f"❌ {path}: {result['error']}", file=sys.stderr)
+            continue
+        if result["skipped"]:
+            print(f"⚠️  Left {path} untouched: {result['skipped']}", file=sys.stderr)
+        elif result["changed"]:
+            changed += 1
+            print(f"{'Would fix' if args.check else 'Fixed'} {path}")
+        if args.timings:
+            print(format_report(result))
+
+    verb = "would change" if args.check else "changed"
+    print(f"{'✅' if not failures else '❌'} {files} files, {changed} {verb}, {failures} errors")
+    if failures:
+        return 1
+    return 1 if args.check and changed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Coverage-guided fuzzer for the diagram fixer.
+
+Starts from the fixture corpus, mutates inputs with box-aware edits, and
+keeps any mutant that reaches new line-to-line transitions in
+fix_diagram.py (traced with sys.settrace, so nothing needs installing).
+Every input is checked against these invariants:
+
+- crash:     fix_diagram_improved raises nothing but BudgetExceeded
+- idempotence: fixing the output again changes nothing
+- outside:   line count is kept and lines outside detected boxes are untouched
+- slow:      runtime stays under --ms-per-kb (with a --min-ms floor)
+- differ:    with --against REV, output matches fix_diagram.py at that git revision
+
+Failures are minimized and written to --findings. Slow inputs are also
+added to the corpus as performance_edge fixtures, with the current
+output as expected, so a later fix shows up as a speedup instead of
+going unnoticed.
+
+Run with:
+    python3 fuzz_fix_diagram.py --seconds 60
+    python3 fuzz_fix_diagram.py --iterations 20000 --seed 3 --against HEAD~5
+    python3 fuzz_fix_diagram.py --atheris -atheris_runs=100000   # needs `pip install atheris`
+"""
+
+import sys
+import time
+import types
+import random
+import hashlib
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Callable, List, Optional, Set, Tuple
+
+import fix_diagram
+from corpus import DEFAULT_CORPUS, Corpus, update_corpus
+
+DEFAULT_MS_PER_KB = 5.0   # Allowed fix time per KB of input
+DEFAULT_MIN_MS = 20.0     # Floor for tiny inputs, where timer noise dominates
+DEFAULT_MAX_LEN = 4096    # Mutants are cut to this many characters
+DEFAULT_FINDINGS = "fuzz_findings"
+DEFAULT_SLOW_CATEGORY = "performance_edge"
+MAX_FINDINGS_PER_KIND = 20
+
+# Characters the mutator favours: everything the detector branches on, plus filler
+ALPHABET = "┌┐└┘│─├┤┬┴┼▶◀▲▼→←↑↓ \n\tab|-+"
+
+def load_reference(revision: str) -> types.ModuleType:
+    """Load fix_diagram.py as it was at a git revision, for differential checks."""
+    here = Path(__file__).resolve().parent
+    source = subprocess.run(["git", "show", f"{revision}:./fix_diagram.py"], cwd=here,
+                            capture_output=True, text=True, check=True).stdout
+    module = types.ModuleType(f"fix_diagram_{revision}")
+    module.__file__ = f"{revision}:fix_diagram.py"
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+def _fix(module, text: str) -> Tuple[Optional[str], Optional[str]]:
+    """Return (output, error); a blown budget leaves the text unchanged, like the CLI.
+
+    Revisions from before the budget existed are called without one.
+    """
+    budget_class = getattr(module, "Budget", None)
+    # except () catches nothing, so a module without BudgetExceeded lets real errors through
+    budget_error = getattr(module, "BudgetExceeded", ())
+    try:
+        if budget_class is None:
+            return module.fix_diagram_improved(text), None
+        return module.fix_diagram_improved(text, budget=budget_class()), None
+    except budget_error:
+        return text, None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def _time_fix(text: str) -> float:
+    start = time.perf_counter()
+    _fix(fix_diagram, text)
+    return time.perf_counter() - start
+
+def check_input(text: str, reference: Optional[types.ModuleType] = None,
+                ms_per_kb: float = DEFAULT_MS_PER_KB, min_ms: float = DEFAULT_MIN_MS,
+                timing: bool = True) -> List[Tuple[str, str]]:
+    """Return (kind, detail) for every invariant the fixer breaks on text."""
+    problems = []
+    output, error = _fix(fix_diagram, text)
+    if error:
+        return [("crash", error)]
+
+    again, error = _fix(fix_diagram, output)
+    if error:
+        problems.append(("crash", f"on second pass: {error}"))
+    elif again != output:
+        problems.append(("idempotence", "fixing the output changed it again"))
+
+    lines, fixed_lines = text.split('\n'), output.split('\n')
+    if len(lines) != len(fixed_lines):
+        problems.append(("outside", f"line count changed from {len(lines)} to {len(fixed_lines)}"))
+    else:
+        box_rows = set()
+        for box in fix_diagram.find_all_boxes(lines):
+            box_rows.update(range(box['top'], box['bottom'] + 1))
+        changed = [row + 1 for row in range(len(lines)) if row not in box_rows and lines[row] != fixed_lines[row]]
+        if changed:
+            problems.append(("outside", f"lines outside boxes changed: {changed[:10]}"))
+
+    if reference is not None:
+        expected, error = _fix(reference, text)
+        if error or expected != output:
+            problems.append(("differ", f"reference gave {'an error' if error else 'different output'}"))
+
+    if timing:
+        allowed_ms = max(min_ms, ms_per_kb * len(text.encode('utf-8')) / 1024)
+        elapsed_ms = _time_fix(text) * 1000
+        if elapsed_ms > allowed_ms:
+            # Best of three, so one scheduler hiccup is not reported as a slow input
+            elapsed_ms = min(elapsed_ms, _time_fix(text) * 1000, _time_fix(text) * 1000)
+        if elapsed_ms > allowed_ms:
+            problems.append(("slow", f"{elapsed_ms:.1f}ms > {allowed_ms:.1f}ms allowed"))
+    return problems
+
+class Coverage:
+    """Line-to-line transitions executed inside one source file."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.edges: Set[Tuple[int, int]] = set()
+
+    def run(self, func: Callable, *args) -> Set[Tuple[int, int]]:
+        """Call func(*args) under a tracer and return the edges it executed."""
+        edges: Set[Tuple[int, int]] = set()
+        filename = self.filename
+
+        def trace_calls(frame, event, arg):
+            if frame.f_code.co_filename != filename:
+                return None
+            last = [frame.f_code.co_firstlineno]
+
+            def trace_lines(frame, event, arg):
+                if event == 'line':
+                    edges.add((last[0], frame.f_lineno))
+                    last[0] = frame.f_lineno
+                return trace_lines
+            return trace_lines
+
+        previous = sys.gettrace()
+        sys.settrace(trace_calls)
+        try:
+            func(*args)
+        except Exception:
+            pass
+        finally:
+            sys.settrace(previous)
+        return edges
+
+    def add(self, edges: Set[Tuple[int, int]]) -> bool:
+        """Merge edges and report whether any were new."""
+        new = edges - self.edges
+        self.edges |= new
+        return bool(new)
+
+def mutate(rng: random.Random, text: str, pool: List[str], max_len: int = DEFAULT_MAX_LEN) -> str:
+    """Apply one to four random edits that stay close to real diagrams."""
+    for _ in range(rng.randint(1, 4)):
+        lines = text.split('\n')
+        row = rng.randrange(len(lines))
+        line = lines[row]
+        col = rng.randint(0, len(line))
+        op = rng.randrange(9)
+        if op == 0:    # insert a structural character
+            lines[row] = line[:col] + rng.choice(ALPHABET) + line[col:]
+        elif op == 1:  # delete a short span
+            lines[row] = line[:col] + line[col + rng.randint(1, 4):]
+        elif op == 2:  # stretch or shrink a border run
+            run_start = line.find('─')
+            if run_start != -1:
+                lines[row] = line[:run_start] + '─' * rng.randint(0, 6) + line[run_start + rng.randint(0, 6):]
+        elif op == 3:  # shift a line sideways
+            lines[row] = ' ' * rng.randint(1, 8) + line if rng.random() < 0.5 else line[rng.randint(1, 4):]
+        elif op == 4:  # duplicate a line, e.g. an extra content row
+            lines.insert(row, line)
+        elif op == 5:  # drop a line
+            if len(lines) > 1:
+                del lines[row]
+        elif op == 6:  # swap two lines
+            other = rng.randrange(len(lines))
+            lines[row], lines[other] = lines[other], line
+        elif op == 7:  # draw a fresh, possibly crooked box into the text
+            width, height = rng.randint(1, 16), rng.randint(0, 8)
+            box = ['┌' + '─' * width + '┐'] + ['│' + ' ' * (width + rng.randint(-2, 2)) + '│'] * height
+            box.append('└' + '─' * (width + rng.randint(-3, 3)) + '┘')
+            for offset, part in enumerate(box):
+                target = row + offset
+                if target >= len(lines):
+                    lines.append('')
+                lines[target] = lines[target][:col].ljust(col) + part + lines[target][col + len(part):]
+        else:          # splice in lines from another input
+            donor = rng.choice(pool).split('\n')
+            start = rng.randrange(len(donor))
+            lines[row:row] = donor[start:start + rng.randint(1, 8)]
+        text = '\n'.join(lines)
+    return text[:max_len]
+
+def minimize(text: str, still_fails: Callable[[str], bool], max_attempts: int = 2000) -> str:
+    """Shrink a failing input by dropping lines, then characters, while it keeps failing."""
+    attempts = 0
+    for unit in ('\n', ''):
+        chunk = max(1, len(text.split(unit)) // 2 if unit else len(text) // 2)
+        while chunk >= 1 and attempts < max_attempts:
+            parts = text.split(unit) if unit else list(text)
+            index, shrunk = 0, False
+            while index < len(parts) and attempts < max_attempts:
+                candidate = unit.join(parts[:index] + parts[index + chunk:])
+                attempts += 1
+                if candidate != text and still_fails(candidate):
+                    text, parts, shrunk = candidate, parts[:index] + parts[index + chunk:], True
+                else:
+                    index += chunk
+            if not shrunk:
+                chunk //= 2
+    return text
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+def save_finding(findings_dir: Path, kind: str, text: str, detail: str) -> Path:
+    findings_dir.mkdir(parents=True, exist_ok=True)
+    path = findings_dir / f"{kind}-{_digest(text)}.md"
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    with open(path.with_suffix(".txt"), 'w', encoding='utf-8') as f:
+        f.write(f"{kind}: {detail}\n")
+    return path
+
+def save_slow_fixture(category: str, text: str) -> str:
+    """Add a slow input to the corpus as a regression fixture in category."""
+    case_name = f"{category}/test_fuzz_{_digest(text)}"
+    output, _ = _fix(fix_diagram, text)
+    update_corpus(DEFAULT_CORPUS, [{"name": case_name, "input": text, "expected": output}])
+    return case_name
+
+def load_seeds(max_len: int) -> List[str]:
+    seeds = ["┌──┐\n│ a│\n└──┘", "┌──┐ ┌──┐\n│  │─▶│  │\n└───┘ └─┘\n  │\n  ▼"]
+    if Path(DEFAULT_CORPUS).exists():
+        with Corpus(DEFAULT_CORPUS) as corpus:
+            seeds += [case["input"] for case in corpus if len(case["input"]) <= max_len]
+    return seeds
+
+# ---------------------------------------------------------------------------
+# Atheris entry point
+# ---------------------------------------------------------------------------
+
+_ATHERIS_OPTIONS = {"reference": None, "ms_per_kb": DEFAULT_MS_PER_KB, "min_ms": DEFAULT_MIN_MS,
+                    "max_len": DEFAULT_MAX_LEN}
+
+def TestOneInput(data: bytes) -> None:
+    """libFuzzer-style entry point: raise on any broken invariant."""
+    text = data.decode('utf-8', errors='replace')[:_ATHERIS_OPTIONS["max_len"]]
+    problems = check_input(text, _ATHERIS_OPTIONS["reference"], _ATHERIS_OPTIONS["ms_per_kb"],
+                           _ATHERIS_OPTIONS["min_ms"])
+    if problems:
+        raise AssertionError("; ".join(f"{kind}: {detail}" for kind, detail in problems))
+
+def run_atheris(extra_args: List[str]) -> None:
+    try:
+        import atheris
+    except ImportError:
+        print("Error: --atheris needs the atheris package (pip install atheris)")
+        sys.exit(1)
+    atheris.instrument_all()
+    atheris.Setup([sys.argv[0]] + extra_args, TestOneInput)
+    atheris.Fuzz()
+
+# ---------------------------------------------------------------------------
+# Built-in fuzzing loop
+# ---------------------------------------------------------------------------
+
+def fuzz(args, reference: Optional[types.ModuleType]) -> int:
+    rng = random.Random(args.seed)
+    coverage = Coverage(fix_diagram.__file__)
+    queue = load_seeds(args.max_len)
+    for seed in queue:
+        coverage.add(coverage.run(fix_diagram.fix_diagram_improved, seed))
+    print(f"Fuzzing fix_diagram: {len(queue)} seeds, {len(coverage.edges)} edges covered")
+
+    findings = {}
+    seen: Set[Tuple[str, str]] = set()
+    start = time.perf_counter()
+    iterations = 0
+    while True:
+        elapsed = time.perf_counter() - start
+        if (args.iterations and iterations >= args.iterations) or (args.seconds and elapsed >= args.seconds):
+            break
+        iterations += 1
+        child = mutate(rng, rng.choice(queue), queue, args.max_len)
+        if coverage.add(coverage.run(fix_diagram.fix_diagram_improved, child)):
+            queue.append(child)
+
+        for kind, detail in check_input(child, reference, args.ms_per_kb, args.min_ms):
+            if findings.get(kind, 0) >= MAX_FINDINGS_PER_KIND:
+                findings[kind] += 1
+                continue
+
+            def still_fails(text: str, kind=kind) -> bool:
+                return any(k == kind for k, _ in check_input(text, reference, timing=False))
+
+            small = child if kind == "slow" else minimize(child, still_fails)
+            if (kind, small) in seen:
+                continue
+            seen.add((kind, small))
+            findings[kind] = findings.get(kind, 0) + 1
+            path = save_finding(Path(args.findings), kind, small, detail)
+            print(f"  ❌ {kind}: {detail} -> {path}")
+            if kind == "slow" and not args.no_save_slow:
+                print(f"     saved fixture {save_slow_fixture(args.slow_category, child)}")
+
+        if iterations % 1000 == 0:
+            rate = iterations / (time.perf_counter() - start)
+            print(f"  {iterations} runs, {rate:.0f}/s, {len(queue)} in queue, {len(coverage.edges)} edges")
+
+    elapsed = time.perf_counter() - start
+    print()
+    print(f"{iterations} runs in {elapsed:.1f}s ({iterations / max(elapsed, 1e-9):.0f}/s), "
+          f"{len(coverage.edges)} edges, {len(queue)} inputs in queue")
+    if findings:
+        summary = ", ".join(f"{kind}: {count}" for kind, count in sorted(findings.items()))
+        print(f"❌ Invariants broken ({summary}); inputs in {args.findings}/")
+        return 1
+    print("🎉 No invariant violations found")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Coverage-guided fuzzing of the diagram fixer.")
+    parser.add_argument("--iterations", type=int, default=0, help="stop after this many runs")
+    parser.add_argument("--seconds", type=float, default=0, help="stop after this long (default 30 without --iterations)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default 0)")
+    parser.add_argument("--max-len", type=int, default=DEFAULT_MAX_LEN,
+                        help=f"longest input in characters (default {DEFAULT_MAX_LEN})")
+    parser.add_argument("--ms-per-kb", type=float, default=DEFAULT_MS_PER_KB,
+                        help=f"slow-input threshold per KB (default {DEFAULT_MS_PER_KB})")
+    parser.add_argument("--min-ms", type=float, default=DEFAULT_MIN_MS,
+                        help=f"slow-input threshold floor (default {DEFAULT_MIN_MS})")
+    parser.add_argument("--against", metavar="REV", help="also compare output with fix_diagram.py at this git revision")
+    parser.add_argument("--findings", default=DEFAULT_FINDINGS, help=f"where failing inputs go (default {DEFAULT_FINDINGS})")
+    parser.add_argument("--slow-category", default=DEFAULT_SLOW_CATEGORY,
+                        help=f"corpus category slow inputs are saved under (default {DEFAULT_SLOW_CATEGORY})")
+    parser.add_argument("--no-save-slow", action="store_true", help="do not save slow inputs as fixtures")
+    parser.add_argument("--atheris", action="store_true", help="run under atheris; remaining arguments go to libFuzzer")
+    args, extra = parser.parse_known_args(argv)
+
+    reference = load_reference(args.against) if args.against else None
+    if args.atheris:
+        _ATHERIS_OPTIONS.update(reference=reference, ms_per_kb=args.ms_per_kb, min_ms=args.min_ms,
+                                max_len=args.max_len)
+        run_atheris(extra)
+        return 0
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    if not args.iterations and not args.seconds:
+        args.seconds = 30
+    return fuzz(args, reference)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,15 +2,36 @@
 """
 Simple test runner for diagram alignment utility.
 Run with: python3 run_tests.py
+Tests run in-process on a worker pool; add --subprocess to run each test
+end to end through `python fix_diagram.py` instead.
+Stress the fixer from many threads with: python3 run_tests.py --stress 16
+Fixtures are read from test_data/corpus.jsonl when it exists (see corpus.py),
+otherwise from the test_data directory layout; --test-dir forces the latter.
+--verify-corpus checks that an exported directory still matches the corpus.
+Corpus cases with a "known_issue" that come out wrong are reported as known
+issues and do not fail the run.
 """
 
 import os
 import sys
+import json
+import time
+import random
+import difflib
+import fnmatch
+import argparse
+import functools
+import statistics
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from typing import List
 
 
+DEFAULT_TIME_BUDGETS = "test_data/timing_budgets.json"
+DEFAULT_CORPUS = "test_data/corpus.jsonl"
+STATE_FILE = ".run_tests_state.json"  # Names of the tests that failed last time, for --failed-first
+
 def discover_tests(test_dir: Path) -> List[dict]:
     """Discover all test cases in the test_data directory."""
     tests = []
@@ -31,58 +52,376 @@ def discover_tests(test_dir: Path) -> List[dict]:
 
     return sorted(tests, key=lambda x: x['name'])
 
-def run_test(test_info: dict) -> bool:
-    """Run a single test case."""
-    print(f"Running: {test_info['name']}")
+def discover_corpus_tests(corpus_path: Path) -> List[dict]:
+    """List the test cases in a corpus file; their text is loaded on demand by read_case."""
+    from corpus import Corpus
+
+    with Corpus(corpus_path) as corpus:
+        return [{"name": name, "corpus": str(corpus_path)} for name in sorted(corpus.names())]
+
+def corpus_problems(corpus_path: Path, test_dir: Path) -> List[str]:
+    """Differences between the corpus and the fixture files in test_dir; empty when they agree."""
+    from corpus import Corpus, verify
+
+    with Corpus(corpus_path) as corpus:
+        return verify(corpus, test_dir)
+
+@functools.lru_cache(maxsize=None)
+def _open_corpus(path: str):
+    # One mmap per worker process, shared by every test it runs
+    from corpus import Corpus
+    return Corpus(path)
+
+def read_case(test_info: dict) -> tuple:
+    """Return (input text, expected text) for a test from either fixture source."""
+    if "corpus" in test_info:
+        case = _open_corpus(test_info["corpus"]).get(test_info["name"])
+        return case["input"], case["expected"]
+    with open(test_info['input'], 'r', encoding='utf-8') as f:
+        input_text = f.read()
+    with open(test_info['expected'], 'r', encoding='utf-8') as f:
+        expected_text = f.read()
+    return input_text, expected_text
+
+def mark_known_issues(tests: List[dict], results: List[dict]) -> None:
+    """Tag output mismatches of corpus cases that carry a known_issue with its reason."""
+    for test_info, result in zip(tests, results):
+        if result["error"] == "Output mismatch" and "corpus" in test_info:
+            reason = _open_corpus(test_info["corpus"]).get(test_info["name"]).get("known_issue")
+            if reason:
+                result["known_issue"] = reason
+
+def is_failure(result: dict) -> bool:
+    return not result["passed"] and "known_issue" not in result
 
+def run_test(test_info: dict) -> dict:
+    """Run a single test case end to end through a `python fix_diagram.py` subprocess."""
     # Copy input to temporary location for processing
     import tempfile
     import shutil
 
+    start = time.perf_counter()
+    result = {"name": test_info["name"], "passed": False, "error": None, "seconds": 0.0}
+
+    try:
+        input_text, expected_output = read_case(test_info)
+    except FileNotFoundError as e:
+        result["error"] = f"File not found - {e}"
+        return result
+
     with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as temp_file:
-        with open(test_info['input'], 'r') as f:
-            temp_file.write(f.read())
+        temp_file.write(input_text)
         temp_path = temp_file.name
 
     try:
         # Run the fix_diagram script
-        result = subprocess.run([
+        completed = subprocess.run([
             sys.executable, 'fix_diagram.py', temp_path
         ], capture_output=True, text=True)
 
-        if result.returncode != 0:
-            print(f"  ❌ FAILED: Script error - {result.stderr}")
-            return False
+        if completed.returncode != 0:
+            result["error"] = f"Script error - {completed.stderr}"
+            return result
 
         # Read the actual output
         with open(temp_path, 'r') as f:
             actual_output = f.read()
 
-        # Read the expected output
-        with open(test_info['expected'], 'r') as f:
-            expected_output = f.read()
-
-        if actual_output == expected_output:
-            print(f"  ✅ PASSED")
-            return True
-        else:
-            print(f"  ❌ FAILED: Output mismatch")
-            # Show first few lines of diff for debugging
-            actual_lines = actual_output.split('\n')[:10]
-            expected_lines = expected_output.split('\n')[:10]
-            print(f"    Expected: {expected_lines}")
-            print(f"    Actual:   {actual_lines}")
-            return False
+        check_output(result, actual_output, expected_output)
+        return result
 
     except FileNotFoundError as e:
-        print(f"  ❌ FAILED: File not found - {e}")
-        return False
+        result["error"] = f"File not found - {e}"
+        return result
     finally:
         # Clean up temporary file
         Path(temp_path).unlink(missing_ok=True)
+        result["seconds"] = time.perf_counter() - start
+
+def run_test_in_process(test_info: dict, repeat: int = 1) -> dict:
+    """Run a single test case by calling the already imported fixer directly.
+
+    Mirrors the command line: the default budget applies, and a file that
+    exceeds it is left untouched. The first call is checked for correctness;
+    with repeat > 1 the fix is timed that many times and 'seconds' is the
+    median, which is steadier than a single run for tracking latency drift.
+    The box fixer in fix_pipeline, which the hooks use, must give the same
+    output as the command line, or the test fails.
+    """
+    import fix_diagram
+    import fix_pipeline
+
+    result = {"name": test_info["name"], "passed": False, "error": None, "seconds": 0.0}
+    try:
+        input_text, expected_output = read_case(test_info)
+    except FileNotFoundError as e:
+        result["error"] = f"File not found - {e}"
+        return result
+
+    def fix() -> str:
+        try:
+            return fix_diagram.fix_diagram_improved(input_text, budget=fix_diagram.Budget.from_env())
+        except fix_diagram.BudgetExceeded:
+            return input_text
+
+    samples = []
+    for iteration in range(max(1, repeat)):
+        start = time.perf_counter()
+        try:
+            output = fix()
+        except Exception as e:
+            result["error"] = f"Script error - {type(e).__name__}: {e}"
+            return result
+        finally:
+            samples.append(time.perf_counter() - start)
+        if iteration == 0:
+            actual_output = output
+    result["seconds"] = statistics.median(samples)
+    result["min_seconds"] = min(samples)
+    result["iterations"] = len(samples)
+
+    check_output(result, actual_output, expected_output)
+    try:
+        pipeline_output = fix_pipeline.run_pipeline(input_text, fix_pipeline.select_fixers(["diagram"]),
+                                                    fix_diagram.Budget.from_env())
+    except fix_diagram.BudgetExceeded:
+        pipeline_output = input_text
+    if pipeline_output != actual_output:
+        result.update(passed=False, error="fix_pipeline output differs from fix_diagram.py",
+                      actual=pipeline_output, expected=actual_output)
+    return result
+
+def test_category(name: str) -> str:
+    """Category of a test is its first directory, e.g. 'basic' for basic/test_01_single_box."""
+    return name.split("/", 1)[0]
+
+def load_time_budgets(path: Path) -> dict:
+    """Read per-category time budgets in milliseconds; '*' is the fallback."""
+    with open(path, 'r', encoding='utf-8') as f:
+        budgets = json.load(f)
+    return {category: float(ms) for category, ms in budgets.items() if not category.startswith("_")}
+
+def check_time_budget(result: dict, budgets: dict) -> None:
+    """Fail a passing result whose median fix time exceeds its category budget."""
+    budget_ms = budgets.get(test_category(result["name"]), budgets.get("*"))
+    if budget_ms is None:
+        return
+    result["budget_ms"] = budget_ms
+    elapsed_ms = result["seconds"] * 1000
+    if result["passed"] and elapsed_ms > budget_ms:
+        result["passed"] = False
+        result["error"] = f"Over time budget - {elapsed_ms:.2f}ms > {budget_ms:g}ms"
+
+def write_json_report(path: str, results: List[dict], mode: str, elapsed: float) -> None:
+    """Write per-test correctness and latency so CI can track drift per fixture."""
+    tests = []
+    for result in results:
+        entry = {
+            "name": result["name"],
+            "category": test_category(result["name"]),
+            "passed": result["passed"],
+            "error": result["error"],
+            "ms": round(result["seconds"] * 1000, 4),
+        }
+        if "known_issue" in result:
+            entry["known_issue"] = result["known_issue"]
+        diff = result_diff(result)
+        if diff:
+            entry["diff"] = diff
+        if "min_seconds" in result:
+            entry["min_ms"] = round(result["min_seconds"] * 1000, 4)
+            entry["iterations"] = result["iterations"]
+        if "budget_ms" in result:
+            entry["budget_ms"] = result["budget_ms"]
+        tests.append(entry)
+    report = {
+        "mode": mode,
+        "wall_seconds": round(elapsed, 4),
+        "passed": sum(1 for result in results if result["passed"]),
+        "failed": sum(1 for result in results if is_failure(result)),
+        "known_issues": sum(1 for result in results if "known_issue" in result),
+        "tests": tests,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+
+def check_output(result: dict, actual_output: str, expected_output: str) -> None:
+    """Mark result passed, or record the output mismatch."""
+    if actual_output == expected_output:
+        result["passed"] = True
+    else:
+        result["error"] = "Output mismatch"
+        result["actual"] = actual_output
+        result["expected"] = expected_output
+
+def result_diff(result: dict) -> str:
+    """Full unified diff from expected to actual output, or '' if there is none."""
+    if "actual" not in result:
+        return ""
+    return "".join(difflib.unified_diff(result["expected"].splitlines(keepends=True),
+                                        result["actual"].splitlines(keepends=True),
+                                        fromfile=f"{result['name']}_expected.md",
+                                        tofile=f"{result['name']}_actual.md"))
+
+def report_result(result: dict, max_diff_lines: int = 40) -> None:
+    """Print one test result in the runner's usual format."""
+    print(f"Running: {result['name']}")
+    timing = f"({result['seconds'] * 1000:.1f}ms)"
+    if result["passed"]:
+        print(f"  ✅ PASSED {timing}")
+        return
+    if "known_issue" in result:
+        print(f"  ⚠️  KNOWN ISSUE: {result['known_issue']} {timing}")
+        return
+    print(f"  ❌ FAILED: {result['error']} {timing}")
+    diff_lines = result_diff(result).splitlines()
+    for line in diff_lines[:max_diff_lines]:
+        print(f"    {line}")
+    if len(diff_lines) > max_diff_lines:
+        print(f"    ... {len(diff_lines) - max_diff_lines} more diff lines (see --json or --junit)")
+
+def select_tests(tests: List[dict], patterns: List[str], categories: List[str]) -> List[dict]:
+    """Keep tests whose name contains or glob-matches any -k pattern and whose category is selected."""
+    selected = []
+    for test in tests:
+        if categories and test_category(test["name"]) not in categories:
+            continue
+        if patterns and not any(p in test["name"] or fnmatch.fnmatchcase(test["name"], p) for p in patterns):
+            continue
+        selected.append(test)
+    return selected
+
+def load_failed(state_path: Path) -> List[str]:
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("failed", [])
+    except (OSError, ValueError):
+        return []
+
+def save_failed(state_path: Path, previous: List[str], results: List[dict]) -> None:
+    """Remember failures: tests that failed now, plus earlier failures that were not rerun."""
+    ran = {result["name"] for result in results}
+    failed = {name for name in previous if name not in ran}
+    failed.update(result["name"] for result in results if is_failure(result))
+    try:
+        with open(state_path, 'w', encoding='utf-8') as f:
+            json.dump({"failed": sorted(failed)}, f, indent=1)
+    except OSError:
+        pass
+
+def write_junit_report(path: str, results: List[dict], elapsed: float) -> None:
+    """Write a JUnit XML report with the full diff of every mismatch."""
+    import xml.etree.ElementTree as ET
+
+    failures = sum(1 for r in results if is_failure(r) and r["error"] and not r["error"].startswith("Script error"))
+    errors = sum(1 for r in results if not r["passed"] and r["error"] and r["error"].startswith("Script error"))
+    skipped = sum(1 for r in results if "known_issue" in r)
+    suite = ET.Element("testsuite", name="fix_diagram", tests=str(len(results)), failures=str(failures),
+                       errors=str(errors), skipped=str(skipped), time=f"{elapsed:.4f}")
+    for result in results:
+        category, _, name = result["name"].rpartition("/")
+        case = ET.SubElement(suite, "testcase", classname=category or "test_data", name=name,
+                             time=f"{result['seconds']:.6f}")
+        if result["passed"]:
+            continue
+        if "known_issue" in result:
+            ET.SubElement(case, "skipped", message=f"Known issue: {result['known_issue']}")
+            continue
+        tag = "error" if result["error"].startswith("Script error") else "failure"
+        element = ET.SubElement(case, tag, message=result["error"].splitlines()[0])
+        element.text = result_diff(result) or result["error"]
+    ET.ElementTree(suite).write(path, encoding="utf-8", xml_declaration=True)
+
+def run_tests(tests: List[dict], jobs: int, use_subprocess: bool, repeat: int = 1) -> List[dict]:
+    """Run tests across a worker pool and return results in test order.
+
+    In-process mode fans out to worker processes that each import
+    fix_diagram once. Subprocess mode already runs in child processes, so
+    it fans out over threads.
+    """
+    runner = run_test if use_subprocess else functools.partial(run_test_in_process, repeat=repeat)
+    if jobs <= 1:
+        return [runner(test) for test in tests]
+    pool_class = ThreadPoolExecutor if use_subprocess else ProcessPoolExecutor
+    with pool_class(max_workers=jobs) as pool:
+        return list(pool.map(runner, tests, chunksize=1 if use_subprocess else max(1, len(tests) // (jobs * 4))))
+
+def run_stress(tests: List[dict], threads: int, iterations: int) -> int:
+    """Run the fixer over the whole corpus from many threads and compare results.
+
+    Every input is first fixed once on the main thread to get a reference
+    output, then each thread fixes the corpus `iterations` times in its own
+    shuffled order. Any result that differs from the reference means the
+    fixer leaked state between concurrent calls.
+    """
+    import fix_diagram
+
+    inputs = {test['name']: read_case(test)[0] for test in tests}
+    reference = {name: fix_diagram.fix_diagram_improved(text) for name, text in inputs.items()}
+
+    def worker(seed: int) -> List[str]:
+        mismatches = []
+        names = list(inputs)
+        rng = random.Random(seed)
+        for _ in range(iterations):
+            rng.shuffle(names)
+            for name in names:
+                if fix_diagram.fix_diagram_improved(inputs[name]) != reference[name]:
+                    mismatches.append(name)
+        return mismatches
+
+    print(f"Stressing {len(inputs)} inputs on {threads} threads x {iterations} iterations")
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(worker, range(threads)))
+
+    mismatches = sorted({name for result in results for name in result})
+    calls = len(inputs) * threads * iterations
+    if mismatches:
+        print(f"❌ {len(mismatches)} inputs gave inconsistent results across {calls} calls:")
+        for name in mismatches:
+            print(f"    {name}")
+        return 1
+    print(f"🎉 All {calls} concurrent calls matched the single-threaded results")
+    return 0
 
 def main():
     """Run all tests."""
+    parser = argparse.ArgumentParser(description="Run the diagram alignment test suite.")
+    parser.add_argument("--stress", type=int, metavar="THREADS",
+                        help="run the corpus concurrently on THREADS threads and compare results")
+    parser.add_argument("--iterations", type=int, default=5,
+                        help="passes over the corpus per stress thread (default 5)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes to fan tests out to (default: CPU count)")
+    parser.add_argument("--subprocess", action="store_true",
+                        help="run each test end to end through a fix_diagram.py subprocess")
+    parser.add_argument("--timings", type=int, default=5, metavar="N",
+                        help="list the N slowest tests after the summary (default 5, 0 to hide)")
+    parser.add_argument("--repeat", type=int, default=1, metavar="N",
+                        help="time each in-process fix N times and report the median (default 1)")
+    parser.add_argument("--time-budgets", metavar="JSON",
+                        help="per-category time budgets in ms; tests over budget fail "
+                             f"(default {DEFAULT_TIME_BUDGETS} when --repeat is given)")
+    parser.add_argument("--json", metavar="PATH", help="write per-test results, timings and full diffs as JSON")
+    parser.add_argument("--junit", metavar="PATH", help="write a JUnit XML report with full diffs")
+    parser.add_argument("-k", dest="patterns", action="append", default=[], metavar="PATTERN",
+                        help="only run tests whose name contains or glob-matches PATTERN (repeatable)")
+    parser.add_argument("-c", "--category", dest="categories", action="append", default=[],
+                        help="only run tests in this category, e.g. basic (repeatable)")
+    parser.add_argument("--failed-first", action="store_true",
+                        help=f"run the tests that failed last time first (remembered in {STATE_FILE})")
+    parser.add_argument("--last-failed", action="store_true",
+                        help="only run the tests that failed last time")
+    parser.add_argument("--corpus", metavar="JSONL",
+                        help=f"read fixtures from this corpus file (default {DEFAULT_CORPUS} if it exists)")
+    parser.add_argument("--test-dir", action="store_true",
+                        help="read fixtures from the test_data directory layout even if a corpus exists")
+    parser.add_argument("--verify-corpus", action="store_true",
+                        help="stop unless fixture files exported into test_data still match the corpus")
+    parser.add_argument("--max-diff-lines", type=int, default=40,
+                        help="diff lines shown per failure on the console (default 40)")
+    args = parser.parse_args()
+
     print("Diagram Alignment Test Suite")
     print("=" * 50)
 
@@ -97,29 +436,95 @@ def main():
         print("Error: test_data directory not found")
         sys.exit(1)
 
-    tests = discover_tests(test_dir)
+    corpus_path = Path(args.corpus or DEFAULT_CORPUS)
+    if args.corpus and not corpus_path.exists():
+        print(f"Error: corpus {corpus_path} not found")
+        sys.exit(1)
+    if args.verify_corpus and corpus_path.exists():
+        # The corpus is the source of truth; catch fixture files edited without `corpus.py build`
+        problems = corpus_problems(corpus_path, test_dir)
+        if problems:
+            print(f"❌ {corpus_path} does not match {test_dir}:")
+            for problem in problems[:10]:
+                print(f"  {problem}")
+            if len(problems) > 10:
+                print(f"  ... and {len(problems) - 10} more")
+            print("Rebuild it with `python3 corpus.py build`, or unpack it with `python3 corpus.py export`.")
+            sys.exit(1)
+    if not args.test_dir and corpus_path.exists():
+        tests = discover_corpus_tests(corpus_path)
+        source = str(corpus_path)
+    else:
+        tests = discover_tests(test_dir)
+        source = str(test_dir)
 
     if not tests:
-        print("No tests found in test_data directory")
+        print(f"No tests found in {source}")
         return
 
-    print(f"Found {len(tests)} test cases")
+    found = len(tests)
+    tests = select_tests(tests, args.patterns, args.categories)
+    state_path = Path(STATE_FILE)
+    previous_failed = load_failed(state_path)
+    if args.last_failed or args.failed_first:
+        failed_names = set(previous_failed)
+        failed_tests = [test for test in tests if test["name"] in failed_names]
+        if args.last_failed:
+            tests = failed_tests
+        else:
+            tests = failed_tests + [test for test in tests if test["name"] not in failed_names]
+
+    if len(tests) == found:
+        print(f"Found {found} test cases in {source}")
+    else:
+        print(f"Found {found} test cases in {source}, {len(tests)} selected")
     print()
+    if not tests:
+        print("No tests selected")
+        return 0
+
+    if args.stress:
+        return run_stress(tests, args.stress, args.iterations)
 
     # Run tests and track results
-    passed = 0
-    failed = 0
+    mode = "subprocess" if args.subprocess else "in-process"
+    start = time.perf_counter()
+    results = run_tests(tests, args.jobs, args.subprocess, args.repeat)
+    elapsed = time.perf_counter() - start
 
-    for test in tests:
-        if run_test(test):
-            passed += 1
-        else:
-            failed += 1
+    # Budgets only make sense for in-process timings; subprocess times are mostly startup
+    budgets_path = args.time_budgets or (DEFAULT_TIME_BUDGETS if args.repeat > 1 else None)
+    if budgets_path and not args.subprocess:
+        budgets = load_time_budgets(Path(budgets_path))
+        for result in results:
+            check_time_budget(result, budgets)
+
+    mark_known_issues(tests, results)
+    for result in results:
+        report_result(result, args.max_diff_lines)
+    save_failed(state_path, previous_failed, results)
+    passed = sum(1 for result in results if result["passed"])
+    known = sum(1 for result in results if "known_issue" in result)
+    failed = len(results) - passed - known
 
     # Summary
     print()
     print("=" * 50)
-    print(f"Test Results: {passed} passed, {failed} failed out of {len(tests)} tests")
+    known_text = f", {known} known issues" if known else ""
+    print(f"Test Results: {passed} passed, {failed} failed{known_text} out of {len(tests)} tests")
+    fix_time = sum(result["seconds"] for result in results)
+    print(f"Runtime: {elapsed:.2f}s wall, {fix_time:.2f}s in tests ({mode}, jobs={args.jobs})")
+    if args.timings > 0:
+        print("Slowest tests:")
+        for result in sorted(results, key=lambda r: r["seconds"], reverse=True)[:args.timings]:
+            budget = f" / {result['budget_ms']:g}ms budget" if "budget_ms" in result else ""
+            print(f"  {result['seconds'] * 1000:8.2f}ms{budget}  {result['name']}")
+    if args.json:
+        write_json_report(args.json, results, mode, elapsed)
+        print(f"JSON report written to {args.json}")
+    if args.junit:
+        write_junit_report(args.junit, results, elapsed)
+        print(f"JUnit report written to {args.junit}")
 
     if failed == 0:
         print("🎉 All tests passed!")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Generate adversarial inputs for worst-case complexity testing of the detector.
+
+Each generator takes a size `n` and returns markdown whose length grows
+linearly with n, shaped to hit a known slow path:
+
+- unmatched_corners:  top borders whose bottom corners never appear
+- deep_bottom_column: tall columns of '└' with no '┘' under repeated tops
+- long_lines:         one very long row of boxes side by side
+- arrow_heavy:        chains of boxes joined by horizontal and vertical arrows
+- nested_grid:        a large grid of boxes, each nested inside another box
+
+Used by ../check_complexity.py. Run directly to write sample files:
+    python3 generate_adversarial.py [n]
+"""
+
+import sys
+from pathlib import Path
+
+def unmatched_corners(n: int) -> str:
+    """n rows of top borders with no bottom border anywhere below them."""
+    rows = ["┌──┐ " * 10 for _ in range(n)]
+    return "# Unmatched Corners\n\n```\n" + "\n".join(rows) + "\n```\n"
+
+def deep_bottom_column(n: int) -> str:
+    """Stacked box tops above a deep column of '└' that never closes.
+
+    The '└' sits inside the detector's search window but off the top's
+    column, so each one is checked for a matching '┘' before moving on.
+    """
+    rows = ["┌──┐"] * (n // 2) + ["     └"] * (n - n // 2)
+    return "# Deep Bottom Column\n\n```\n" + "\n".join(rows) + "\n```\n"
+
+def long_lines(n: int) -> str:
+    """A single row of n small boxes, making three very long lines."""
+    top = "┌────┐ " * n
+    content = "│ ab │ " * n
+    bottom = "└──────┘ " * n
+    return "# Long Lines\n\n```\n" + "\n".join([top, content, bottom]) + "\n```\n"
+
+def arrow_heavy(n: int) -> str:
+    """n rows of boxes joined by horizontal arrows, with vertical arrows between rows."""
+    blocks = []
+    for _ in range(n):
+        blocks.append("┌─────┐────▶┌─────┐◀────┌─────┐")
+        blocks.append("│  A  │     │  B  │     │  C  │")
+        blocks.append("└───────┘     └─────┘     └─────┘")
+        blocks.append("   │           │           │")
+        blocks.append("   ▼           ▼           ▼")
+    return "# Arrow Heavy\n\n```\n" + "\n".join(blocks) + "\n```\n"
+
+def nested_grid(n: int, columns: int = 8) -> str:
+    """A grid of n cells, each an outer box holding a misaligned inner box."""
+    outer_top = "┌──────────┐ "
+    inner_top = "│ ┌──────┐ │ "
+    inner_mid = "│ │ item │ │ "
+    inner_bot = "│ └────────┘ │ "
+    outer_bot = "└──────────┘ "
+    rows = []
+    for _ in range(max(1, n // columns)):
+        for part in (outer_top, inner_top, inner_mid, inner_bot, outer_bot):
+            rows.append(part * columns)
+    return "# Nested Grid\n\n```\n" + "\n".join(rows) + "\n```\n"
+
+GENERATORS = {
+    "unmatched_corners": unmatched_corners,
+    "deep_bottom_column": deep_bottom_column,
+    "long_lines": long_lines,
+    "arrow_heavy": arrow_heavy,
+    "nested_grid": nested_grid,
+}
+
+def create_adversarial_files(n: int = 100) -> None:
+    """Write one sample of each adversarial input into ./adversarial_samples."""
+    out_dir = Path("adversarial_samples")
+    out_dir.mkdir(exist_ok=True)
+    for name, generate in GENERATORS.items():
+        path = out_dir / f"{name}_{n}.md"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(generate(n))
+        print(f"Created: {path}")
+
+if __name__ == "__main__":
+    create_adversarial_files(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
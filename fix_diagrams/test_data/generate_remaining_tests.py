@@ -3,9 +3,14 @@
 Generate the remaining unit tests that weren't created in the first batch.
 """
 
-import os
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from corpus import add_templates, templates_main
+
+CORPUS_PATH = "corpus.jsonl"  # Relative to test_data, where this script is run
+
 # Additional test templates for the remaining 29 tests
 REMAINING_TESTS = {
     # Additional edge cases
@@ -550,7 +555,6 @@ index abc123..def456 100644
  ```
 
  This is the updated diagram.
-"""
 """
     },
 
@@ -580,7 +584,6 @@ Text content here.
 ```
 
 More text content.
-"""
 """
     },
 
@@ -696,7 +699,6 @@ $ cat diagram.txt
 │ Terminal    │
 │ Output      │
 └─────────────┘
-"""
 """
     },
 
@@ -734,7 +736,6 @@ CONTAINER ID   IMAGE
 │   Running   │
 │ Container   │
 └─────────────┘
-"""
 """
     },
 
@@ -919,7 +920,6 @@ CONTAINER ID   IMAGE
 │ Alpha   │     │   Alpha     │
 └─────────┘     └─────────────┘
 ```
-"""
 """
 
     },
@@ -987,7 +987,6 @@ CONTAINER ID   IMAGE
 │     A     │     └─────────────────┘     └─────┘
 └───────────┘
 ```
-"""
 """
 
     },
@@ -1031,7 +1030,6 @@ Diagram shows: Start Process button leads to Processing status.
 
 ## Alternative Text Reference
 Diagram shows: Start Process button leads to Processing status.
-"""
 """
     },
 
@@ -1093,7 +1091,6 @@ Diagram shows: Start Process button leads to Processing status.
 └─────────────────┘
 \x1b[0m
 ```
-"""
 """
 
     },
@@ -1168,37 +1165,14 @@ Diagram shows: Start Process button leads to Processing status.
 │   Box A     │────▶│   Box B     │
 └─────────────┘     └─────────────┘
 ```
-"""
 """
 
     }
 }
 
-def create_remaining_test_files():
-    """Create the remaining test input and expected output files."""
-    base_path = Path(".")
-
-    print("Generating remaining test files...")
-
-    for test_name, data in REMAINING_TESTS.items():
-        # Create directory if it doesn't exist
-        test_dir = base_path / test_name.rsplit("/", 1)[0]
-        test_dir.mkdir(parents=True, exist_ok=True)
-
-        # Write input file
-        input_path = base_path / f"{test_name}_input.md"
-        with open(input_path, 'w', encoding='utf-8') as f:
-            f.write(data["input"])
-
-        # Write expected file
-        expected_path = base_path / f"{test_name}_expected.md"
-        with open(expected_path, 'w', encoding='utf-8') as f:
-            f.write(data["expected"])
-
-        print(f"Created: {test_name}")
-
-    print(f"\nGenerated {len(REMAINING_TESTS)} additional test case pairs.")
-    print("Total test files now available.")
+def create_remaining_test_files(force: bool = False):
+    """Write the remaining test inputs and expected outputs into the fixture corpus."""
+    add_templates(CORPUS_PATH, REMAINING_TESTS, force)
 
 if __name__ == "__main__":
-    create_remaining_test_files()
\ No newline at end of file
+    sys.exit(templates_main(CORPUS_PATH, REMAINING_TESTS, "Add the remaining template test cases to the fixture corpus."))
@@ -4,9 +4,14 @@ Generate all test input and expected output files for the 50 test cases.
 This script creates comprehensive test data covering all scenarios.
 """
 
-import os
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from corpus import add_templates, templates_main
+
+CORPUS_PATH = "corpus.jsonl"  # Relative to test_data, where this script is run
+
 # Test data templates
 TEST_TEMPLATES = {
     # Basic tests
@@ -1062,7 +1067,6 @@ Text content here.
 ```
 
 More text content.
-"""
 """
     },
 
@@ -1178,7 +1182,6 @@ $ cat diagram.txt
 │ Terminal    │
 │ Output      │
 └─────────────┘
-"""
 """
     },
 
@@ -1216,7 +1219,6 @@ CONTAINER ID   IMAGE
 │   Running   │
 │ Container   │
 └─────────────┘
-"""
 """
     },
 
@@ -1401,7 +1403,6 @@ CONTAINER ID   IMAGE
 │ Alpha   │     │   Alpha     │
 └─────────┘     └─────────────┘
 ```
-"""
 """
 
     },
@@ -1469,7 +1470,6 @@ CONTAINER ID   IMAGE
 │     A     │     └─────────────────┘     └─────┘
 └───────────┘
 ```
-"""
 """
 
     },
@@ -1513,7 +1513,6 @@ Diagram shows: Start Process button leads to Processing status.
 
 ## Alternative Text Reference
 Diagram shows: Start Process button leads to Processing status.
-"""
 """
     },
 
@@ -1575,7 +1574,6 @@ Diagram shows: Start Process button leads to Processing status.
 └─────────────────┘
 \x1b[0m
 ```
-"""
 """
 
     },
@@ -1650,37 +1648,14 @@ Diagram shows: Start Process button leads to Processing status.
 │   Box A     │────▶│   Box B     │
 └─────────────┘     └─────────────┘
 ```
-"""
 """
 
     }
 }
 
-def create_test_files():
-    """Create all test input and expected output files."""
-    base_path = Path(".")
-
-    print("Generating test files...")
-
-    for test_name, data in TEST_TEMPLATES.items():
-        # Create directory if it doesn't exist
-        test_dir = base_path / test_name.rsplit("/", 1)[0]
-        test_dir.mkdir(parents=True, exist_ok=True)
-
-        # Write input file
-        input_path = base_path / f"{test_name}_input.md"
-        with open(input_path, 'w', encoding='utf-8') as f:
-            f.write(data["input"])
-
-        # Write expected file
-        expected_path = base_path / f"{test_name}_expected.md"
-        with open(expected_path, 'w', encoding='utf-8') as f:
-            f.write(data["expected"])
-
-        print(f"Created: {test_name}")
-
-    print(f"\nGenerated {len(TEST_TEMPLATES)} test case pairs.")
-    print("Each test has an _input.md and _expected.md file.")
+def create_test_files(force: bool = False):
+    """Write the test inputs and expected outputs into the fixture corpus."""
+    add_templates(CORPUS_PATH, TEST_TEMPLATES, force)
 
 if __name__ == "__main__":
-    create_test_files()
\ No newline at end of file
+    sys.exit(templates_main(CORPUS_PATH, TEST_TEMPLATES, "Add the template test cases to the fixture corpus."))
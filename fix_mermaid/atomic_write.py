@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Atomic file replacement shared by the diagram and mermaid tools.
+
+Standard library only, so any tool can import it without loading the
+others. fix_diagrams/atomic_write.py is a symlink to this file; copy it
+into .claude/hooks/ next to the hook scripts that use it.
+"""
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+def _file_mode(path):
+    """Mode for a rewritten file: keep the existing one, else honour the umask."""
+    if os.path.exists(path):
+        return stat.S_IMODE(os.stat(path).st_mode)
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+def write_text_atomic(path, text, before_replace=None):
+    """Write text next to path and rename it over path, keeping the file's permissions.
+
+    Readers never see half a file, and text is written byte for byte
+    (newline=''). If before_replace() returns False, the file is left
+    alone. Returns whether path was replaced.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        os.chmod(temp_path, _file_mode(path))
+        if before_replace is not None and not before_replace():
+            os.unlink(temp_path)
+            return False
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+    return True
@@ -1,66 +1,694 @@
 # fix_mermaid.py
 # Claude hook: process mermaid charts in PRD to make them GitHub-compatible
+#
+# Usage:
+#   python fix_mermaid.py input.md [output.md]       # writes <stem>_fixed.md by default
+#   python fix_mermaid.py --in-place docs/ prd.md    # recursive; only changed files are rewritten
+#   python fix_mermaid.py --check docs/              # exit 1 if any file would change
+#   python fix_mermaid.py --hook < hook.json         # post-write hook, see fix_mermaid.sh
+#
+# validate_mermaid.py checks charts for GitHub render errors without changing them;
+# mermaid_graph.py lists node, edge and fix counts per chart.
+# split_mermaid.py cuts flowcharts too big for GitHub into several smaller ones.
 
+import os
 import re
+import json
 import sys
+import time
+import hashlib
+import functools
+import threading
+import unicodedata
+from collections import OrderedDict
 from pathlib import Path
 
-MAX_LABEL_LENGTH = 50  # Max chars per node label to avoid parser issues
+from atomic_write import write_text_atomic
+
+MAX_LABEL_LENGTH = 50  # Max display cells per label line to avoid parser issues
+
+LABEL_CACHE_SIZE = 4096  # Distinct labels remembered across documents
+# Replacements for characters that break the GitHub Mermaid parser. Applied
+# with str.replace: str.translate has to take its slow path for multi-character
+# replacements like "and" and measures several times slower on real labels.
+LABEL_ESCAPES = (
+    ("&", "and"),
+    ("<", "("),
+    (">", ")"),
+    ('"', "'"),
+    ("\n", " | "),
+)
 
 def escape_label(text):
     """Escape or replace characters that break GitHub Mermaid parser."""
     if not text:
         return ""
-    text = text.replace("&", "and")
-    text = text.replace("<", "(").replace(">", ")")
-    text = text.replace('"', "'")
-    text = text.replace("\n", " | ")
+    for char, replacement in LABEL_ESCAPES:
+        if char in text:
+            text = text.replace(char, replacement)
     return text
 
+LABEL_SEPARATOR = " | "
+
+class _WidthTable(dict):
+    """Display cells per character, looked up in unicodedata the first time each is seen."""
+
+    def __missing__(self, char):
+        if unicodedata.combining(char) or unicodedata.category(char) in ("Mn", "Me", "Cf"):
+            width = 0
+        elif unicodedata.east_asian_width(char) in ("W", "F"):
+            width = 2
+        else:
+            width = 1
+        self[char] = width
+        return width
+
+_char_widths = _WidthTable()
+EMOJI_PRESENTATION = "\ufe0f"  # Variation selector that draws a text symbol as an emoji
+# Places to break a word too long for one line (URLs, paths, identifiers), after the character
+WORD_BREAKS = "/.-_?&=#:,;+"
+
+def char_width(char):
+    """Display cells for one character: 0 for combining marks, 2 for wide CJK and emoji, else 1."""
+    return _char_widths[char]
+
+def _measure(text, start, limit):
+    """Return (index, width) for the longest run of text[start:] at most limit cells wide."""
+    width = 0
+    previous = 0
+    for index in range(start, len(text)):
+        char = text[index]
+        cells = _char_widths[char]
+        if cells:
+            previous = cells if char > "\x7f" else 0  # Spaces and ASCII never turn into emoji
+        elif char == EMOJI_PRESENTATION and previous == 1:
+            cells = 1  # The text symbol before it is drawn two cells wide
+            previous = 2
+        if width + cells > limit:
+            return index, width
+        width += cells
+    return len(text), width
+
+def display_width(text):
+    """Display cells text takes up; len() for ASCII."""
+    if text.isascii():
+        return len(text)
+    if EMOJI_PRESENTATION not in text:
+        return sum(map(_char_widths.__getitem__, text))
+    return _measure(text, 0, float("inf"))[1]
+
+def _fit(word, start, max_length, ascii_only):
+    """Index just past the longest run of word[start:] that fits in max_length cells."""
+    if ascii_only:
+        return min(len(word), start + max_length)
+    return max(_measure(word, start, max_length)[0], start + 1)
+
+def _break_word(word, max_length, ascii_only):
+    """Cut a word wider than max_length into lines, preferring to cut after a WORD_BREAKS character."""
+    pieces = []
+    start = 0
+    size = len(word)
+    while True:
+        end = _fit(word, start, max_length, ascii_only)
+        if end >= size:
+            pieces.append(word[start:])
+            return pieces
+        # Only look back over the second half of the line, so pieces do not get tiny
+        low = start + (end - start) // 2
+        cut = max(word.rfind(char, low, end) for char in WORD_BREAKS) + 1
+        if cut <= low:
+            cut = end
+        while not ascii_only and cut > start + 1 and char_width(word[cut]) == 0:
+            cut -= 1  # Keep combining marks with their base character
+        pieces.append(word[start:cut])
+        start = cut
+
 def split_long_label(label, max_length=MAX_LABEL_LENGTH):
-    """Split very long labels into shorter segments with '|'-style separator."""
-    if len(label) <= max_length:
+    """Split very long labels into shorter segments with '|'-style separator.
+
+    Length is measured in display cells, so CJK characters and emoji
+    count double. A single word too wide for a line, such as a URL, is
+    cut after a '/', '.', '-' or similar near the limit, else at the limit.
+    Existing separators are kept as breaks, so splitting an already split
+    label returns it unchanged.
+    """
+    ascii_only = label.isascii()
+    if (len(label) if ascii_only else display_width(label)) <= max_length:
         return label
     parts = []
-    words = label.split()
-    current = ""
-    for word in words:
-        if len(current) + len(word) + 1 <= max_length:
-            current += (" " if current else "") + word
+    for segment in label.split(LABEL_SEPARATOR):
+        current = []
+        current_length = 0
+        for word in segment.split():
+            length = len(word) if ascii_only else display_width(word)
+            if length > max_length:
+                if current:
+                    parts.append(" ".join(current))
+                pieces = _break_word(word, max_length, ascii_only)
+                parts.extend(pieces[:-1])
+                word = pieces[-1]
+                length = len(word) if ascii_only else display_width(word)
+                current = []
+                current_length = 0
+            elif current and current_length + length + 1 > max_length:
+                parts.append(" ".join(current))
+                current = []
+                current_length = 0
+            current_length += length + (1 if current else 0)
+            current.append(word)
+        if current:
+            parts.append(" ".join(current))
+    return LABEL_SEPARATOR.join(parts)
+
+MERMAID_HINT = re.compile("mermaid", re.IGNORECASE)
+
+def might_contain_chart(content):
+    """Cheap prefilter: False means content certainly has no mermaid block."""
+    return MERMAID_HINT.search(content) is not None
+
+NODE_PATTERN = re.compile(r'(\w+)\[(.*?)\]')
+FENCE_CHARS = "`~"
+MIN_FENCE_LENGTH = 3
+MAX_FENCE_INDENT = 3  # CommonMark: four spaces make an indented code block, not a fence
+
+def _fence_at(content, start, end):
+    """Return (char, length, info) if the line content[start:end] is a code fence, else None."""
+    pos = start
+    while pos < end and pos - start <= MAX_FENCE_INDENT and content[pos] == " ":
+        pos += 1
+    if pos - start > MAX_FENCE_INDENT or pos >= end or content[pos] not in FENCE_CHARS:
+        return None
+    char = content[pos]
+    run_end = pos
+    while run_end < end and content[run_end] == char:
+        run_end += 1
+    length = run_end - pos
+    info = content[run_end:end].strip()
+    if length < MIN_FENCE_LENGTH or (char == "`" and "`" in info):
+        return None
+    return char, length, info
+
+def _fence_lines(content):
+    """Yield (line_start, line_end, char, length, info) for every fence line, in order.
+
+    Jumps between ``` and ~~~ runs with str.find, remembering the next hit of
+    each, so prose between fences is never looked at character by character
+    and no part of the document is searched twice.
+    """
+    size = len(content)
+    next_hit = {"`": content.find("```"), "~": content.find("~~~")}
+    pos = 0
+    while True:
+        hits = [hit for hit in next_hit.values() if hit != -1]
+        if not hits:
+            return
+        hit = min(hits)
+        line_start = content.rfind("\n", 0, hit) + 1
+        line_end = content.find("\n", hit)
+        if line_end == -1:
+            line_end = size
+        if hit - line_start <= MAX_FENCE_INDENT:
+            fence = _fence_at(content, line_start, line_end)
+            if fence:
+                yield (line_start, line_end) + fence
+        pos = line_end + 1
+        for char, run in (("`", "```"), ("~", "~~~")):
+            if next_hit[char] != -1 and next_hit[char] < pos:
+                next_hit[char] = content.find(run, pos)
+
+def iter_fenced_blocks(content):
+    """Yield (start, end, language) for the body of every fenced code block in content.
+
+    language is the first word of the info string, lowercased, or '' for a
+    bare fence. One forward pass over the document; a fence line inside a
+    block is part of its body, so a ```mermaid line shown inside a longer
+    ```` fence is not a block of its own. A fence closes on a line of the
+    same character, at least as long as the opener, with nothing after it;
+    an unclosed block runs to the end.
+    """
+    size = len(content)
+    fences = _fence_lines(content)
+    for _, line_end, char, length, info in fences:
+        body_start = min(line_end + 1, size)
+        body_end = size
+        for line_start, _, close_char, close_length, close_info in fences:
+            if close_char == char and close_length >= length and not close_info:
+                body_end = line_start
+                break
+        yield body_start, body_end, info.split(None, 1)[0].lower() if info else ""
+
+def iter_mermaid_blocks(content):
+    """Yield (start, end) offsets of the body of every ```mermaid block in content."""
+    for start, end, language in iter_fenced_blocks(content):
+        if language == "mermaid":
+            yield start, end
+
+# Flowchart node shapes: opener after the node id -> closers that may end it.
+# Longest openers first, so '((' wins over '(' and '[(' over '['.
+NODE_SHAPES = (
+    ("(((", (")))",)),
+    ("((", ("))",)),
+    ("([", ("])",)),
+    ("(", (")",)),
+    ("[[", ("]]",)),
+    ("[(", (")]",)),
+    ("[/", ("/]", "\\]")),
+    ("[\\", ("\\]", "/]")),
+    ("[", ("]",)),
+    ("{{", ("}}",)),
+    ("{", ("}",)),
+    (">", ("]",)),
+)
+SHAPES_BY_CHAR = {}
+for _opener, _closers in NODE_SHAPES:
+    SHAPES_BY_CHAR.setdefault(_opener[0], []).append((_opener, _closers))
+FLOWCHART_KEYWORDS = ("graph", "flowchart", "flowchart-elk")
+ARROW_CHARS = "->=."
+QUOTE_TRIGGERS = set("[](){}|")  # Unquoted, these end or confuse a label
+# A short ASCII label without any of these comes out of fix_label unchanged
+LABEL_SPECIALS = re.compile("[" + re.escape("".join(char for char, _ in LABEL_ESCAPES) +
+                                            "".join(sorted(QUOTE_TRIGGERS))) + "]")
+# Shape openers only count straight after a node id, so arrows ('-->') never stop the scan.
+# One leading character class lets re skip ahead quickly; the id check is a lookbehind after it.
+LEXER_STOPS = re.compile(r'[\[({>|"%](?:(?<=[|"%])|(?<=\w.))')
+
+@functools.lru_cache(maxsize=LABEL_CACHE_SIZE)
+def fix_label(label, quoted=False, quote=True):
+    """Escape and wrap one label; quote it when it still holds shape syntax.
+
+    Memoized: generated charts repeat the same labels many times. Pass
+    quote=False for the id[label] regex path, which never quotes.
+    """
+    fixed = split_long_label(escape_label(label))
+    if quoted or (quote and not QUOTE_TRIGGERS.isdisjoint(fixed)):
+        return f'"{fixed}"'
+    return fixed
+
+def label_cache_info():
+    """Hits, misses and size of the label memo, as functools.lru_cache reports them."""
+    return fix_label.cache_info()
+
+def label_cache_hit_rate():
+    """Fraction of label lookups served from the memo (0.0 before any lookup)."""
+    info = fix_label.cache_info()
+    lookups = info.hits + info.misses
+    return info.hits / lookups if lookups else 0.0
+
+def clear_label_cache():
+    """Forget memoized labels and reset the hit counters."""
+    fix_label.cache_clear()
+
+def find_label_end(chart, start, line_end, closers):
+    """Return (label_end, closer) for a label starting at start, or None if it is not closed on this line."""
+    if chart.startswith('"', start):
+        quote_end = chart.find('"', start + 1, line_end)
+        if quote_end != -1:
+            for closer in closers:
+                if chart.startswith(closer, quote_end + 1):
+                    return quote_end + 1, closer
+    best = None
+    for closer in closers:
+        end = chart.find(closer, start, line_end)
+        if end != -1 and (best is None or end < best[0]):
+            best = (end, closer)
+    return best
+
+def _rewrite(pieces, chart, copied, start, end):
+    """Append chart[copied:start] and the fixed label chart[start:end]; return the new copy offset."""
+    label = chart[start:end]
+    if len(label) <= MAX_LABEL_LENGTH and label.isascii() and LABEL_SPECIALS.search(label) is None:
+        return copied  # Most labels: skip the memo lookup and the splitter
+    quoted = len(label) >= 2 and label[0] == label[-1] == '"'
+    fixed = fix_label(label[1:-1] if quoted else label, quoted)
+    if fixed == label:
+        return copied
+    pieces.append(chart[copied:start])
+    pieces.append(fixed)
+    return end
+
+def fix_flowchart(chart, stats=None):
+    """Fix every node and edge label of a flowchart in one left-to-right pass.
+
+    The lexer jumps between characters that can start a token: a shape
+    opener straight after a node id, '|' (an edge label if it follows an
+    arrow), a quoted string or a %% comment to skip. Each character is
+    looked at a bounded number of times, and unchanged text is copied by
+    slice. Rewritten labels are counted in stats['labels'] if stats is given.
+    """
+    pieces = []
+    copied = 0
+    pos = 0
+    size = len(chart)
+    while True:
+        stop = LEXER_STOPS.search(chart, pos)
+        if stop is None:
+            break
+        pos = stop.start()
+        char = chart[pos]
+        line_end = chart.find("\n", pos)
+        if line_end == -1:
+            line_end = size
+
+        if char == "%":
+            line_start = chart.rfind("\n", 0, pos) + 1
+            if chart.startswith("%%", pos) and not chart[line_start:pos].strip():
+                pos = line_end
+            else:
+                pos += 1
+            continue
+
+        if char == '"':
+            quote_end = chart.find('"', pos + 1, line_end)
+            pos = quote_end + 1 if quote_end != -1 else pos + 1
+            continue
+
+        if char == "|":
+            back = pos
+            while back and chart[back - 1] == " ":
+                back -= 1
+            tail = chart[max(back - 2, 0):back]
+            if tail and (tail[-1] in ARROW_CHARS or (tail[-1] in "ox" and tail[:-1] in ARROW_CHARS and len(tail) == 2)):
+                # A quoted label may hold '|' (LABEL_SEPARATOR); close after the quote
+                found = find_label_end(chart, pos + 1, line_end, ("|",))
+                if found is not None:
+                    copied = _rewrite(pieces, chart, copied, pos + 1, found[0])
+                    pos = found[0] + 1
+                    continue
+            pos += 1
+            continue
+
+        for opener, closers in SHAPES_BY_CHAR[char]:
+            if chart.startswith(opener, pos):
+                label_start = pos + len(opener)
+                found = find_label_end(chart, label_start, line_end, closers)
+                if found is not None:
+                    label_end, closer = found
+                    copied = _rewrite(pieces, chart, copied, label_start, label_end)
+                    pos = label_end + len(closer)
+                    break
         else:
-            parts.append(current)
-            current = word
-    if current:
-        parts.append(current)
-    return " | ".join(parts)
-
-def fix_mermaid(content):
-    """Take raw mermaid chart and return GitHub-compatible version."""
-    node_pattern = re.compile(r'(\w+)\[(.*?)\]')
+            pos += 1
+    if not pieces:
+        return chart
+    if stats is not None:
+        stats["labels"] += len(pieces) // 2  # One prefix and one label per rewrite
+    pieces.append(chart[copied:])
+    return "".join(pieces)
+
+def fix_node_labels(chart, stats=None):
+    """Fix id[label] nodes only; used for chart types the flowchart lexer does not know."""
+    rewritten = 0
     def replace_node(match):
-        node_id = match.group(1)
-        label = match.group(2)
-        label = escape_label(label)
-        label = split_long_label(label)
-        return f"{node_id}[{label}]"
-    fixed_content = node_pattern.sub(replace_node, content)
-    return fixed_content
+        nonlocal rewritten
+        label = fix_label(match.group(2), False, False)
+        rewritten += label != match.group(2)
+        return f"{match.group(1)}[{label}]"
+    fixed = NODE_PATTERN.sub(replace_node, chart)
+    if stats is not None:
+        stats["labels"] += rewritten
+    return fixed
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python fix_mermaid.py <input_file> [<output_file>]")
-        sys.exit(1)
+def chart_type(chart):
+    """Return the diagram keyword of a chart body (e.g. 'flowchart', 'sequenceDiagram'), or ''."""
+    in_front_matter = False
+    start = 0
+    while start < len(chart):
+        end = chart.find("\n", start)
+        if end == -1:
+            end = len(chart)
+        line = chart[start:end].strip()
+        start = end + 1
+        if line == "---":
+            in_front_matter = not in_front_matter
+        elif line and not in_front_matter and not line.startswith("%%"):
+            return line.split(None, 1)[0]
+    return ""
 
-    input_file = Path(sys.argv[1])
-    if not input_file.exists():
-        print(f"Error: {input_file} does not exist.")
-        sys.exit(1)
+def new_stats():
+    """Counters filled in by the fixers when a stats dict is passed to them."""
+    return {"charts": 0, "charts_changed": 0, "labels": 0}
+
+CHART_CACHE_SIZE = 512  # Fixed charts remembered across documents, keyed by content hash
+_chart_cache = OrderedDict()
+_chart_cache_counts = {"hits": 0, "misses": 0}
+# fix_async fixes documents on a thread pool; the lock covers lookups and evictions,
+# not the fixing itself, so two threads may fix the same new chart once each
+_chart_cache_lock = threading.Lock()
+
+def chart_digest(chart):
+    """Content hash that identifies a chart body in the caches."""
+    return hashlib.blake2b(chart.encode("utf-8"), digest_size=16).digest()
+
+def _fix_chart_uncached(chart, stats):
+    if chart_type(chart) in FLOWCHART_KEYWORDS:
+        return fix_flowchart(chart, stats)
+    return fix_node_labels(chart, stats)
+
+def fix_mermaid_chart(chart, stats=None):
+    """Take the body of one mermaid chart and return a GitHub-compatible version.
+
+    Results are cached by content hash, so a chart seen before (in this
+    document, an earlier one, or an earlier run of a long-lived process) is
+    not lexed again. An unchanged chart is returned as the same object.
+    """
+    key = chart_digest(chart)
+    with _chart_cache_lock:
+        cached = _chart_cache.get(key)
+        if cached is None:
+            _chart_cache_counts["misses"] += 1
+        else:
+            _chart_cache_counts["hits"] += 1
+            _chart_cache.move_to_end(key)
+    if cached is None:
+        counts = new_stats()
+        fixed = _fix_chart_uncached(chart, counts)
+        # Unchanged charts store None rather than a second copy of the text
+        cached = (None if fixed == chart else fixed, counts["labels"])
+        with _chart_cache_lock:
+            _chart_cache[key] = cached
+            if len(_chart_cache) > CHART_CACHE_SIZE:
+                _chart_cache.popitem(last=False)
+    fixed, labels = cached
+    if stats is not None:
+        stats["labels"] += labels
+    return chart if fixed is None else fixed
+
+def chart_cache_info():
+    """Hits, misses, current size and capacity of the fixed-chart cache."""
+    with _chart_cache_lock:
+        return dict(_chart_cache_counts, size=len(_chart_cache), maxsize=CHART_CACHE_SIZE)
+
+def clear_chart_cache():
+    """Forget cached charts and reset the counters."""
+    with _chart_cache_lock:
+        _chart_cache.clear()
+        _chart_cache_counts.update(hits=0, misses=0)
+
+def fix_mermaid(content, stats=None):
+    """Fix every ```mermaid block in a markdown document.
+
+    Only chart bodies go through fix_mermaid_chart; text outside them is
+    copied by slice. Returns content itself when no chart changed. Pass a
+    dict from new_stats() to count charts scanned and labels rewritten.
+    """
+    if not might_contain_chart(content):
+        return content
+    pieces = []
+    copied = 0
+    for start, end in iter_mermaid_blocks(content):
+        chart = content[start:end]
+        fixed = fix_mermaid_chart(chart, stats)
+        if stats is not None:
+            stats["charts"] += 1
+            stats["charts_changed"] += fixed != chart
+        if fixed != chart:
+            pieces.append(content[copied:start])
+            pieces.append(fixed)
+            copied = end
+    if not pieces:
+        return content
+    pieces.append(content[copied:])
+    return "".join(pieces)
+
+MARKDOWN_SUFFIXES = (".md", ".markdown")
+POOL_MIN_FILES = 16  # Smaller batches are fixed in-process; a pool costs more to start than it saves
 
-    output_file = Path(sys.argv[2]) if len(sys.argv) >= 3 else Path(input_file.stem + "_fixed.md")
+def _is_markdown_file(name):
+    # Hidden names cover editor swap files and our own temporary files
+    return name.endswith(MARKDOWN_SUFFIXES) and not name.startswith(".")
 
+def iter_markdown_files(paths):
+    """Yield files given directly, and markdown files found recursively under directories."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for name in sorted(filenames):
+                if _is_markdown_file(name):
+                    yield os.path.join(dirpath, name)
+
+def fix_file(path, write=True):
+    """Fix one markdown file in place, writing only if a chart changed.
+
+    Returns a result dict: 'path', 'changed', 'error' (None on success),
+    the new_stats() counters and the chart cache and label memo hits and
+    misses it caused.
+    Errors are reported, not raised, so one bad file does not stop a batch.
+    """
+    result = dict(new_stats(), path=path, changed=False, error=None,
+                  cache_hits=0, cache_misses=0, chart_hits=0, chart_misses=0)
+    before = label_cache_info()
+    charts_before = chart_cache_info()
+    try:
+        # newline='' keeps CRLF files byte for byte outside the rewritten labels
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            content = f.read()
+        fixed = fix_mermaid(content, result)
+        if fixed is not content:
+            result["changed"] = True
+            if write:
+                write_text_atomic(path, fixed)
+    except (OSError, UnicodeDecodeError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    after = label_cache_info()
+    result["cache_hits"] = after.hits - before.hits
+    result["cache_misses"] = after.misses - before.misses
+    charts_after = chart_cache_info()
+    result["chart_hits"] = charts_after["hits"] - charts_before["hits"]
+    result["chart_misses"] = charts_after["misses"] - charts_before["misses"]
+    return result
+
+def fix_files(paths, write=True, jobs=None):
+    """Fix many files, yielding result dicts; large batches use a process pool."""
+    paths = list(paths)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) < POOL_MIN_FILES:
+        for path in paths:
+            yield fix_file(path, write)
+        return
+    # Imported here: it is slow to import and the hook never needs it
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        chunksize = max(1, min(64, len(paths) // (jobs * 4)))
+        yield from pool.map(functools.partial(fix_file, write=write), paths, chunksize=chunksize)
+
+def read_hook_path(stream):
+    """The markdown file named by a post-write hook's JSON payload, or None.
+
+    Accepts the path at the top level or under tool_input, as 'path' or
+    'file_path'. Returns None for other files and for files that are gone.
+    Raises ValueError if the payload is not JSON.
+    """
+    payload = json.load(stream)
+    if not isinstance(payload, dict):
+        return None
+    tool_input = payload.get("tool_input")
+    for source in (payload, tool_input if isinstance(tool_input, dict) else {}):
+        for key in ("path", "file_path"):
+            path = source.get(key)
+            if isinstance(path, str) and path:
+                if _is_markdown_file(os.path.basename(path)) and os.path.isfile(path):
+                    return path
+                return None
+    return None
+
+def run_hook(stream=None):
+    """Post-write hook: fix the file named on stdin in place. Returns the exit status."""
+    try:
+        path = read_hook_path(stream or sys.stdin)
+    except ValueError as e:
+        print(f"fix_mermaid hook: input is not hook JSON: {e}", file=sys.stderr)
+        return 1
+    if path is None:
+        return 0
+    result = fix_file(path)
+    if result["error"]:
+        print(f"fix_mermaid hook: {path}: {result['error']}", file=sys.stderr)
+        return 1
+    if result["changed"]:
+        print(f"Fixed {result['labels']} mermaid labels in {path}")
+    return 0
+
+def _fix_legacy(input_file, output_file):
+    """The original single-file form: write the fixed document to output_file."""
+    input_file = Path(input_file)
+    if not input_file.exists():
+        print(f"Error: {input_file} does not exist.")
+        return 1
+    output_file = Path(output_file) if output_file else Path(input_file.stem + "_fixed.md")
     content = input_file.read_text()
     fixed = fix_mermaid(content)
     output_file.write_text(fixed)
-
     print(f"Fixed Mermaid charts written to {output_file}")
+    return 0
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Make mermaid charts in markdown files GitHub-compatible.",
+        epilog="Without --in-place or --check: fix_mermaid.py INPUT [OUTPUT] writes the fixed "
+               "document to OUTPUT (default <stem>_fixed.md in the current directory).")
+    parser.add_argument("paths", nargs="*", help="markdown files, or directories to search recursively")
+    parser.add_argument("-i", "--in-place", action="store_true",
+                        help="fix files in place; only files with a changed chart are rewritten")
+    parser.add_argument("--check", action="store_true",
+                        help="report files that would change without writing; exit 1 if any would")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help=f"worker processes for batches of {POOL_MIN_FILES}+ files (default: one per CPU)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print errors and the summary")
+    parser.add_argument("--hook", action="store_true",
+                        help="read post-write hook JSON on stdin and fix the named file in place")
+    args = parser.parse_args(argv)
+
+    if args.hook:
+        if args.paths:
+            parser.error("--hook takes the file from stdin, not from arguments")
+        return run_hook()
+    if not args.paths:
+        parser.error("give files or directories to fix, or --hook")
 
+    if not args.in_place and not args.check:
+        if len(args.paths) > 2 or any(os.path.isdir(path) for path in args.paths):
+            parser.error("several files or a directory need --in-place or --check")
+        return _fix_legacy(args.paths[0], args.paths[1] if len(args.paths) == 2 else None)
+    if args.in_place and args.check:
+        parser.error("give either --in-place or --check, not both")
+
+    start = time.perf_counter()
+    totals = dict(new_stats(), files=0, changed=0, errors=0,
+                  cache_hits=0, cache_misses=0, chart_hits=0, chart_misses=0)
+    for result in fix_files(iter_markdown_files(args.paths), write=args.in_place, jobs=args.jobs):
+        totals["files"] += 1
+        for key in ("charts", "charts_changed", "labels", "cache_hits", "cache_misses",
+                    "chart_hits", "chart_misses"):
+            totals[key] += result[key]
+        if result["error"]:
+            totals["errors"] += 1
+            print(f"❌ {result['path']}: {result['error']}")
+        elif result["changed"]:
+            totals["changed"] += 1
+            if not args.quiet:
+                verb = "Fixed" if args.in_place else "Would fix"
+                print(f"{verb} {result['path']} ({result['labels']} labels)")
+    elapsed = time.perf_counter() - start
+
+    hit_rate = ""
+    for name, hits, misses in (("chart", "chart_hits", "chart_misses"), ("label", "cache_hits", "cache_misses")):
+        lookups = totals[hits] + totals[misses]
+        if lookups:
+            hit_rate += f", {name} cache hit rate {totals[hits] / lookups:.1%}"
+    action = "rewrote" if args.in_place else "would rewrite"
+    status = "❌" if totals["errors"] else ("⚠️" if args.check and totals["changed"] else "✅")
+    print(f"{status} Scanned {totals['files']} files and {totals['charts']} charts in {elapsed:.2f}s: "
+          f"{action} {totals['labels']} labels in {totals['charts_changed']} charts "
+          f"across {totals['changed']} files{hit_rate}")
+    if totals["errors"]:
+        print(f"❌ {totals['errors']} files could not be fixed")
+        return 1
+    return 1 if args.check and totals["changed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+#!/bin/bash
+
+# Post-write hook: fix mermaid charts in the edited markdown file in place.
+# fix_mermaid.py reads the hook JSON from stdin and returns without touching
+# the file unless it is markdown with a mermaid block, so no jq or grep runs.
+exec python3 "$CLAUDE_PROJECT_DIR/.claude/hooks/fix_mermaid.py" --hook
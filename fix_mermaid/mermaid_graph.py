@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Lightweight graph model of mermaid flowcharts, and per-chart statistics.
+
+parse_flowchart() turns a flowchart body into plain dicts:
+
+    {"type": "flowchart", "direction": "TD", "lines": 42,
+     "nodes":     {"A": {"id", "shape", "label", "text", "line", "subgraph"}},
+     "edges":     [{"source", "target", "link", "label", "text", "line"}],
+     "subgraphs": {"S1": {"id", "title", "line", "end_line", "parent", "nodes"}},
+     "directives": [{"line", "text"}], "front_matter": ""}
+
+Line numbers are 1-based within the chart body. A node's shape is its
+opener ('[', '((', '{{', ...) or '' for a bare id, and text is the source
+of the token that defined it, class suffix included. Front matter
+(between '---' lines) is kept verbatim in "front_matter". Models are
+cached by content hash, like the fixed charts in fix_mermaid, so a chart
+is parsed once however often it is asked about.
+
+Usage:
+    python3 mermaid_graph.py docs/ [more.md ...]        # one row per chart
+    python3 mermaid_graph.py --min-nodes 100 docs/      # only big charts
+    python3 mermaid_graph.py --json docs/               # one JSON object per chart
+"""
+
+import re
+import sys
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from fix_mermaid import (FLOWCHART_KEYWORDS, SHAPES_BY_CHAR, chart_digest, chart_type,
+                         find_label_end, fix_mermaid_chart, iter_markdown_files,
+                         iter_mermaid_blocks, new_stats)
+
+MODEL_CACHE_SIZE = 256  # Parsed charts remembered, keyed by content hash
+
+FLOWCHART_DIRECTIVES = ("classDef", "class", "style", "linkStyle", "click", "direction")
+TOKEN = re.compile(r"""
+      (?P<space>[ \t]+)
+    | (?P<sep>[;&])
+    | (?P<textlink>(?:--|==|-\.)(?=[ \t]+[^-=.\s]))                 # opens '-- text -->'
+    | (?P<link>(?:<|[ox](?=[-=.~]))?(?:-{2,}|={2,}|-\.+-|~{3,})(?:>|[ox](?!\w))?)
+    | (?P<id>\w+)
+    | (?P<other>.)
+""", re.VERBOSE)
+TEXT_LINK_END = re.compile(r"(?:-{2,}|={2,}|\.-+)(?:>|[ox](?!\w))?")
+NODE_SUFFIX = re.compile(r":::[\w-]+|@\{[^}]*\}")  # class shorthand, v11 shape syntax
+
+_models: "OrderedDict[bytes, dict]" = OrderedDict()
+_models_lock = threading.Lock()  # Same policy as the chart cache in fix_mermaid
+
+def _new_model() -> dict:
+    return {"type": "flowchart", "direction": "", "lines": 0,
+            "nodes": {}, "edges": [], "subgraphs": {}, "directives": [], "front_matter": ""}
+
+def _add_node(model: dict, node_id: str, line: int, subgraph: Optional[str],
+              shape: str = "", label: Optional[str] = None, text: Optional[str] = None) -> None:
+    node = model["nodes"].get(node_id)
+    if node is None:
+        node = model["nodes"][node_id] = {"id": node_id, "shape": "", "label": None,
+                                          "text": node_id, "line": line, "subgraph": subgraph}
+        if subgraph is not None:
+            model["subgraphs"][subgraph]["nodes"].append(node_id)
+    if shape and node["label"] is None:
+        node.update(shape=shape, label=label, text=text, line=line)
+
+def _parse_statement(model: dict, line: str, number: int, subgraph: Optional[str]) -> None:
+    """Add the nodes and edges of one statement line; chains and '&' groups expand to edges."""
+    chain: List = [[]]  # Alternating node groups and link dicts
+    size = len(line)
+    pos = 0
+
+    def finish() -> None:
+        for i in range(1, len(chain) - 1, 2):
+            for source in chain[i - 1]:
+                for target in chain[i + 1]:
+                    model["edges"].append(dict(chain[i], source=source, target=target, line=number))
+        chain[:] = [[]]
+
+    while pos < size:
+        match = TOKEN.match(line, pos)
+        kind = match.lastgroup
+        pos = match.end()
+        if kind == "id":
+            node_id = match.group()
+            shape = label = None
+            for opener, closers in SHAPES_BY_CHAR.get(line[pos:pos + 1], ()):
+                if line.startswith(opener, pos):
+                    found = find_label_end(line, pos + len(opener), size, closers)
+                    if found is not None:
+                        label_end, closer = found
+                        shape, label = opener, line[pos + len(opener):label_end]
+                        pos = label_end + len(closer)
+                        break
+            suffix = NODE_SUFFIX.match(line, pos)
+            if suffix:
+                pos = suffix.end()
+            text = line[match.start():pos]
+            if isinstance(chain[-1], dict):
+                chain.append([])
+            chain[-1].append(node_id)
+            _add_node(model, node_id, number, subgraph, shape or "", label, text)
+        elif kind in ("link", "textlink"):
+            link = {"link": match.group(), "label": None, "text": match.group()}
+            if kind == "textlink":
+                end = TEXT_LINK_END.search(line, pos)
+                if end is None:
+                    continue
+                link.update(link=end.group(), label=line[pos:end.start()].strip(),
+                            text=line[match.start():end.end()])
+                pos = end.end()
+            elif line.startswith("|", pos):
+                found = find_label_end(line, pos + 1, size, ("|",))
+                if found is not None:
+                    label_end = found[0]
+                    link.update(label=line[pos + 1:label_end], text=line[match.start():label_end + 1])
+                    pos = label_end + 1
+            if isinstance(chain[-1], dict):
+                chain[-1] = link  # Two links in a row: keep the later one
+            elif chain[-1]:
+                chain.append(link)
+        elif kind == "sep" and match.group() == ";":
+            finish()
+    finish()
+
+def parse_flowchart(chart: str) -> dict:
+    """Parse a flowchart body into the graph model described in the module docstring."""
+    lines = chart.split("\n")
+    model = _new_model()
+    model["lines"] = len(lines)
+    stack: List[str] = []
+    header_seen = False
+    front_matter_end = -1
+    if lines and lines[0].strip() == "---":
+        front_matter_end = next((i for i in range(1, len(lines)) if lines[i].strip() == "---"), -1)
+        model["front_matter"] = "\n".join(lines[:front_matter_end + 1])
+    for index, raw in enumerate(lines):
+        number = index + 1
+        line = raw.strip()
+        if index <= front_matter_end or not line or line.startswith("%%"):
+            continue
+        word = line.split(None, 1)[0]
+        if not header_seen:
+            header_seen = True
+            parts = line.split(";", 1)[0].split()
+            model["direction"] = parts[1] if len(parts) > 1 else ""
+            continue
+        if word == "subgraph":
+            rest = line[len(word):].strip()
+            head = re.match(r"(\w+)\s*(?:\[(.*)\])?$", rest)
+            if head:
+                sub_id, title = head.group(1), head.group(2) if head.group(2) is not None else head.group(1)
+            else:
+                sub_id = title = rest
+            title = title.strip('"')
+            model["subgraphs"][sub_id] = {"id": sub_id, "title": title, "line": number, "end_line": None,
+                                          "parent": stack[-1] if stack else None, "nodes": []}
+            stack.append(sub_id)
+        elif word == "end" and line.rstrip(";") == "end":
+            if stack:
+                model["subgraphs"][stack.pop()]["end_line"] = number
+        elif word in FLOWCHART_DIRECTIVES:
+            model["directives"].append({"line": number, "text": line})
+        else:
+            _parse_statement(model, line, number, stack[-1] if stack else None)
+    # Edges may point at a subgraph by id; that is not a node of its own
+    for sub_id in model["subgraphs"]:
+        node = model["nodes"].pop(sub_id, None)
+        if node is not None and node["subgraph"] is not None:
+            model["subgraphs"][node["subgraph"]]["nodes"].remove(sub_id)
+    return model
+
+def chart_model(chart: str) -> Optional[dict]:
+    """Cached graph model of a flowchart body, or None for other chart types.
+
+    Every caller asking about the same chart gets the same dict; treat it
+    as read-only, or copy.deepcopy() it first.
+    """
+    if chart_type(chart) not in FLOWCHART_KEYWORDS:
+        return None
+    key = chart_digest(chart)
+    with _models_lock:
+        model = _models.get(key)
+        if model is not None:
+            _models.move_to_end(key)
+    if model is None:
+        model = parse_flowchart(chart)
+        with _models_lock:
+            _models[key] = model
+            if len(_models) > MODEL_CACHE_SIZE:
+                _models.popitem(last=False)
+    return model
+
+def chart_stats(chart: str) -> dict:
+    """Size of one chart and how many labels fix_mermaid would rewrite in it."""
+    model = chart_model(chart)
+    counts = new_stats()
+    fix_mermaid_chart(chart, counts)
+    return {
+        "type": chart_type(chart),
+        "digest": chart_digest(chart).hex(),
+        "lines": chart.count("\n") + 1,
+        "nodes": len(model["nodes"]) if model else None,
+        "edges": len(model["edges"]) if model else None,
+        "subgraphs": len(model["subgraphs"]) if model else None,
+        "fixes": counts["labels"],
+    }
+
+def document_stats(content: str) -> List[dict]:
+    """chart_stats() for every ```mermaid block, with the document line each body starts on."""
+    stats = []
+    line = 1
+    counted_to = 0
+    for start, end in iter_mermaid_blocks(content):
+        line += content.count("\n", counted_to, start)
+        counted_to = start
+        stats.append(dict(chart_stats(content[start:end]), line=line))
+    return stats
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="List mermaid charts with their node, edge and fix counts.")
+    parser.add_argument("paths", nargs="+", help="markdown files, or directories to search recursively")
+    parser.add_argument("--min-nodes", type=int, default=0, help="only list flowcharts with at least this many nodes")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per chart")
+    args = parser.parse_args(argv)
+
+    rows: List[Dict] = []
+    for path in iter_markdown_files(args.paths):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"❌ {path}: {type(e).__name__}: {e}", file=sys.stderr)
+            continue
+        for stats in document_stats(content):
+            if (stats["nodes"] or 0) >= args.min_nodes:
+                rows.append(dict(stats, path=path))
+
+    if args.json:
+        for row in rows:
+            print(json.dumps(row))
+        return 0
+    print(f"{'chart':<50} {'type':<16} {'lines':>6} {'nodes':>6} {'edges':>6} {'subgr':>6} {'fixes':>6}")
+    for row in rows:
+        where = f"{row['path']}:{row['line']}"
+        counts = [row[key] if row[key] is not None else "-" for key in ("nodes", "edges", "subgraphs")]
+        print(f"{where:<50} {row['type']:<16} {row['lines']:>6} {counts[0]:>6} {counts[1]:>6} "
+              f"{counts[2]:>6} {row['fixes']:>6}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
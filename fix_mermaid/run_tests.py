@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Property tests for the mermaid tools.
+Run with: python3 run_tests.py
+Each test builds its own charts, so there are no fixture files; a test
+passes when it returns and fails on the first AssertionError.
+"""
+
+import sys
+import time
+import random
+import traceback
+from typing import Callable, List
+
+import fix_mermaid
+import mermaid_graph
+import split_mermaid
+import validate_mermaid
+
+TESTS: List[Callable[[], None]] = []
+
+def test(function: Callable[[], None]) -> Callable[[], None]:
+    TESTS.append(function)
+    return function
+
+def _words(count: int) -> str:
+    return " ".join(f"word{i}" for i in range(count))
+
+@test
+def test_wrapped_edge_labels_are_stable():
+    """A wrapped edge label holds ' | ' inside its quotes; fixing it again must not move the closer."""
+    for chart in (f"flowchart TD\n    A -->|{_words(30)} end| B",
+                  f"flowchart TD\n    A -- text --> B\n    B ==>|{_words(12)} & <more>| C --> D[{_words(15)}]",
+                  f"graph LR\n    A -.->|\"{_words(20)}\"| B\n    B --> C"):
+        once = fix_mermaid.fix_mermaid_chart(chart)
+        twice = fix_mermaid.fix_mermaid_chart(once)
+        assert twice == once, f"not idempotent:\n{once}\n{twice}"
+        assert fix_mermaid.LABEL_SEPARATOR in once, f"label was not wrapped:\n{once}"
+
+@test
+def test_validator_accepts_wrapped_edge_labels():
+    """The validator reads quoted edge labels to their closing quote, so the fixer's output is clean."""
+    chart = fix_mermaid.fix_mermaid_chart(f"flowchart TD\n    A -->|{_words(30)} end| B --> C")
+    issues = validate_mermaid.validate_flowchart(chart.split("\n"))
+    assert not issues, issues
+
+def _random_chart(nodes: int, edges: int, seed: int) -> str:
+    rng = random.Random(seed)
+    lines = ["flowchart LR"]
+    lines += [f"    N{rng.randrange(nodes)} --> N{rng.randrange(nodes)}" for _ in range(edges)]
+    return "\n".join(lines)
+
+def _grouped_chart(groups: int, size: int, seed: int) -> str:
+    """Subgraphs of a cycle each, some nested, with cross links and edges to subgraphs."""
+    rng = random.Random(seed)
+    lines = ["graph TD"]
+    for group in range(groups):
+        lines.append(f"    subgraph S{group} [Group {group}]")
+        lines += [f"        S{group}N{i} --> S{group}N{(i + 1) % size}" for i in range(size)]
+        if group % 3 == 0:
+            lines.append(f"        subgraph T{group}")
+            lines += [f"            T{group}N{i}" for i in range(size // 2)]
+            lines.append("        end")
+        lines.append("    end")
+    for _ in range(groups * 3):
+        lines.append(f"    S{rng.randrange(groups)}N{rng.randrange(size)} --> S{rng.randrange(groups)}N{rng.randrange(size)}")
+    lines += [f"    S{rng.randrange(groups)} --> T{3 * rng.randrange((groups + 2) // 3)}" for _ in range(groups)]
+    return "\n".join(lines)
+
+@test
+def test_split_parts_stay_within_limits():
+    """Every part, stubs and cross edges included, re-parses within --max-nodes and --max-edges."""
+    chain = "flowchart TD\n" + "\n".join(f"    N{i}[Node {i}] --> N{i + 1}" for i in range(500))
+    charts = [chain] + [_random_chart(300, 420, seed) for seed in range(3)]
+    charts += [_grouped_chart(12, 25, seed) for seed in range(3)]
+    for max_nodes, max_edges in ((100, 200), (40, 60), (20, 30)):
+        for chart in charts:
+            parts = split_mermaid.split_chart(chart, max_nodes, max_edges)
+            assert len(parts) > 1, "chart was not split"
+            original = set(mermaid_graph.parse_flowchart(chart)["nodes"])
+            kept = set()
+            for part in parts:
+                model = mermaid_graph.parse_flowchart(part)
+                assert len(model["nodes"]) <= max_nodes and len(model["edges"]) <= max_edges, \
+                    f"part has {len(model['nodes'])} nodes, {len(model['edges'])} edges " \
+                    f"(limits {max_nodes}, {max_edges})"
+                kept.update(model["nodes"])
+                assert split_mermaid.split_chart(part, max_nodes, max_edges) == [part], "part split again"
+            assert original <= kept, f"{len(original - kept)} nodes lost"
+
+def main() -> int:
+    print("Mermaid Tools Test Suite")
+    print("=" * 50)
+    failed = 0
+    start = time.perf_counter()
+    for function in TESTS:
+        print(f"Running: {function.__name__}")
+        try:
+            function()
+        except AssertionError:
+            failed += 1
+            print("  ❌ FAILED:")
+            for line in traceback.format_exc().rstrip().split("\n")[-6:]:
+                print(f"    {line}")
+        else:
+            print("  ✅ PASSED")
+    print()
+    print("=" * 50)
+    print(f"Test Results: {len(TESTS) - failed} passed, {failed} failed out of {len(TESTS)} tests")
+    print(f"Runtime: {time.perf_counter() - start:.2f}s")
+    if failed:
+        print("❌ Some tests failed")
+        return 1
+    print("🎉 All tests passed!")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
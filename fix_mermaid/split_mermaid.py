@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Split oversized mermaid flowcharts into several smaller charts.
+
+GitHub gives up on flowcharts past a few hundred nodes or edges. A chart
+over the --max-nodes or --max-edges limit is cut into parts that each
+stay under them. Subgraphs are kept whole where they fit. A subgraph
+that does not fit is opened up into its child subgraphs and nodes, and
+its box is drawn again in every part that holds some of it. Whatever
+is left is taken in breadth-first order over the edges, so neighbours
+land in the same part. An edge between two parts is drawn in both, to
+a dashed stub node that names the part the other end lives in. Stubs
+and those edges count against the limits like any other.
+
+Every step is linear in nodes plus edges, on top of the cached model
+from mermaid_graph, so splitting is cheap enough to run from a hook.
+
+Limits: the parts are rebuilt from the model, so comments and the
+original line layout are not kept, and numbered linkStyle lines are
+dropped because edge numbers change between parts.
+
+Usage:
+    python3 split_mermaid.py docs/                        # list charts that would be split
+    python3 split_mermaid.py --in-place docs/ prd.md      # split them in the files
+    python3 split_mermaid.py --check --max-nodes 60 docs/ # exit 1 if any chart is too big
+"""
+
+import re
+import sys
+import argparse
+from collections import deque
+from typing import Dict, List, Optional
+
+from atomic_write import write_text_atomic
+from fix_mermaid import chart_type, iter_markdown_files, iter_mermaid_blocks
+from mermaid_graph import chart_model
+
+DEFAULT_MAX_NODES = 100
+DEFAULT_MAX_EDGES = 200
+INDENT = "    "
+STUB_CLASS = "splitRef"
+STUB_CLASS_DEF = f"classDef {STUB_CLASS} stroke-dasharray: 4 4"
+FENCE_OPENER = re.compile(r"( *)([`~]+)")
+# Written into every part; a chart carrying it is never split again, stubs and all
+SPLIT_MARKER = re.compile(r"^[ \t]*%% Part \d+ of \d+, split from", re.MULTILINE)
+
+def new_split_stats() -> Dict[str, int]:
+    return {"charts": 0, "charts_split": 0, "parts": 0}
+
+def _first_nodes(model: dict) -> Dict[str, Optional[str]]:
+    """First node anywhere inside each subgraph, for edges drawn to the subgraph itself."""
+    first: Dict[str, Optional[str]] = {}
+    # A subgraph is defined before its children, so walking backwards sees children first
+    subgraphs = model["subgraphs"]
+    for sub_id, sub in reversed(list(subgraphs.items())):
+        if sub["nodes"]:
+            first[sub_id] = sub["nodes"][0]
+        else:
+            first.setdefault(sub_id, None)
+        parent = sub["parent"]
+        if parent is not None and not subgraphs[parent]["nodes"] and first[sub_id] is not None:
+            first[parent] = first[sub_id]
+    return first
+
+def _resolve(model: dict, first_node: Dict[str, Optional[str]], node_id: str) -> Optional[str]:
+    """The node an edge endpoint stands for: itself, or the first node inside a subgraph."""
+    if node_id in model["nodes"]:
+        return node_id
+    return first_node.get(node_id)
+
+def _incidence(model: dict, first_node: Dict[str, Optional[str]]) -> Dict[str, List[tuple]]:
+    """Per node, (other node, other end as written) for every edge end on it.
+
+    The written id is what split_chart names a stub after, so a part that
+    reaches a subgraph and a node inside it draws two stubs. An end that
+    resolves to no node counts as a loop: the edge is drawn with the other end.
+    """
+    incident: Dict[str, List[tuple]] = {node_id: [] for node_id in model["nodes"]}
+    for edge in model["edges"]:
+        source = _resolve(model, first_node, edge["source"])
+        target = _resolve(model, first_node, edge["target"])
+        if source is None and target is None:
+            continue
+        if source is None or target is None:
+            node_id = source or target
+            incident[node_id].append((node_id, node_id))
+            continue
+        incident[source].append((target, edge["target"]))
+        if target != source:
+            incident[target].append((source, edge["source"]))
+    return incident
+
+def _cost(members: List[str], incident: Dict[str, List[tuple]]) -> tuple:
+    """(nodes, edges) of a part holding exactly these nodes, counting its stubs and cross edges."""
+    inside = set(members)
+    stubs = set()
+    edges = 0
+    for node_id in members:
+        for other, written in incident[node_id]:
+            if other not in inside:
+                edges += 1
+                stubs.add(written)
+            elif other <= node_id:  # Counted from one end only
+                edges += 1
+    return len(inside) + len(stubs), edges
+
+def _units(model: dict, incident: Dict[str, List[tuple]], max_nodes: int, max_edges: int) -> List[List[str]]:
+    """Groups of node ids to keep together: subgraphs that fit, else their children, else single nodes."""
+    subgraphs = model["subgraphs"]
+    children: Dict[Optional[str], List[str]] = {sub_id: [] for sub_id in subgraphs}
+    children[None] = []
+    for sub_id, sub in subgraphs.items():
+        children[sub["parent"]].append(sub_id)
+    totals: Dict[str, int] = {}
+
+    def total(sub_id: str) -> int:
+        if sub_id not in totals:
+            totals[sub_id] = len(subgraphs[sub_id]["nodes"]) + sum(total(child) for child in children[sub_id])
+        return totals[sub_id]
+
+    def members(sub_id: str, into: List[str]) -> List[str]:
+        into.extend(subgraphs[sub_id]["nodes"])
+        for child in children[sub_id]:
+            members(child, into)
+        return into
+
+    units: List[List[str]] = []
+
+    def expand(sub_id: str) -> None:
+        if total(sub_id) <= max_nodes:
+            if not total(sub_id):
+                return
+            unit = members(sub_id, [])
+            nodes, edges = _cost(unit, incident)
+            if nodes <= max_nodes and edges <= max_edges:
+                units.append(unit)
+                return
+        for child in children[sub_id]:
+            expand(child)
+        units.extend([node_id] for node_id in subgraphs[sub_id]["nodes"])
+
+    for sub_id in children[None]:
+        expand(sub_id)
+    units.extend([node["id"]] for node in model["nodes"].values() if node["subgraph"] is None)
+    units.sort(key=lambda unit: min(model["nodes"][node_id]["line"] for node_id in unit))
+    return units
+
+def partition(model: dict, max_nodes: int = DEFAULT_MAX_NODES,
+              max_edges: int = DEFAULT_MAX_EDGES) -> List[List[str]]:
+    """Split the nodes of a flowchart model into parts of at most max_nodes nodes and max_edges edges.
+
+    The limits hold for the parts split_chart draws: a part's own nodes
+    plus the stubs it needs, and every edge that touches it. A single node
+    with too many edges for that, or a stub per neighbour too many, still
+    gets a part to itself; that is the best a split can do for it.
+    """
+    incident = _incidence(model, _first_nodes(model))
+    units = _units(model, incident, max_nodes, max_edges)
+    unit_of = {node_id: index for index, unit in enumerate(units) for node_id in unit}
+
+    # Breadth-first over units, so connected units end up next to each other
+    order: List[int] = []
+    seen = [False] * len(units)
+    for start in range(len(units)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        queue = deque([start])
+        while queue:
+            index = queue.popleft()
+            order.append(index)
+            for node_id in units[index]:
+                for other, _ in incident[node_id]:
+                    neighbour = unit_of[other]
+                    if not seen[neighbour]:
+                        seen[neighbour] = True
+                        queue.append(neighbour)
+
+    # The current part's stubs, by the node they stand for; a node joining the part replaces its stubs
+    parts: List[List[str]] = []
+    inside: set = set()
+    stubs: Dict[str, set] = {}
+    node_count = edge_count = 0
+    for index in order:
+        unit = units[index]
+        in_unit = set(unit)
+        new_stubs: Dict[str, set] = {}
+        added_edges = 0
+        for node_id in unit:
+            for other, written in incident[node_id]:
+                if other in in_unit:
+                    added_edges += other <= node_id
+                elif other not in inside:
+                    added_edges += 1
+                    if written not in stubs.get(other, ()):
+                        new_stubs.setdefault(other, set()).add(written)
+        replaced = sum(len(stubs.get(node_id, ())) for node_id in unit)
+        added_nodes = len(unit) - replaced + sum(len(written) for written in new_stubs.values())
+        if parts and node_count + added_nodes <= max_nodes and edge_count + added_edges <= max_edges:
+            node_count += added_nodes
+            edge_count += added_edges
+            for node_id in unit:
+                stubs.pop(node_id, None)
+        else:
+            parts.append([])
+            inside = set()
+            stubs = {}
+            node_count, edge_count = _cost(unit, incident)
+            new_stubs = {}
+            for node_id in unit:
+                for other, written in incident[node_id]:
+                    if other not in in_unit:
+                        new_stubs.setdefault(other, set()).add(written)
+        parts[-1].extend(unit)
+        inside.update(unit)
+        for other, written in new_stubs.items():
+            stubs.setdefault(other, set()).update(written)
+    return parts
+
+def _stub_label(model: dict, node_id: str, arrow: str, part: int) -> str:
+    node = model["nodes"].get(node_id)
+    label = node["label"] if node and node["label"] is not None else node_id
+    label = label.strip()
+    if len(label) > 1 and label[0] == label[-1] == '"':
+        label = label[1:-1]
+    label = label.replace('"', "#quot;")
+    return f'{arrow} Part {part}: {label}'
+
+def _subgraph_header(sub: dict) -> str:
+    if sub["title"] == sub["id"]:
+        return f"subgraph {sub['id']}"
+    title = sub["title"].replace('"', "#quot;")
+    return f'subgraph {sub["id"]} ["{title}"]'
+
+def _directive_for_part(text: str, in_part) -> Optional[str]:
+    """A style, class or click directive restricted to one part's nodes, or None if none apply."""
+    words = text.split(None, 2)
+    keyword = words[0]
+    if keyword == "classDef":
+        return text
+    if keyword == "linkStyle":
+        return text if len(words) > 1 and words[1] == "default" else None
+    if len(words) < 2:
+        return None
+    if keyword == "class":
+        kept = [node_id for node_id in words[1].split(",") if in_part(node_id)]
+        if not kept:
+            return None
+        return " ".join(["class", ",".join(kept)] + words[2:])
+    # style, click: the node id comes first
+    return text if in_part(words[1]) else None
+
+def split_chart(chart: str, max_nodes: int = DEFAULT_MAX_NODES,
+                max_edges: int = DEFAULT_MAX_EDGES, newline: str = "\n") -> List[str]:
+    """Split a flowchart body into part bodies; returns [chart] when it is small enough or not a flowchart."""
+    if SPLIT_MARKER.search(chart):
+        return [chart]
+    model = chart_model(chart)
+    if model is None or (len(model["nodes"]) <= max_nodes and len(model["edges"]) <= max_edges):
+        return [chart]
+    parts = partition(model, max_nodes, max_edges)
+    if len(parts) < 2:
+        return [chart]
+    subgraphs = model["subgraphs"]
+    part_of = {node_id: index for index, part in enumerate(parts) for node_id in part}
+    sub_part = {sub_id: part_of.get(node_id) for sub_id, node_id in _first_nodes(model).items()}
+
+    # Subgraph-level 'direction' lines go back into the innermost subgraph around them
+    sub_directions: Dict[str, str] = {}
+    directives: List[str] = []
+    for directive in model["directives"]:
+        if directive["text"].split(None, 1)[0] != "direction":
+            directives.append(directive["text"])
+            continue
+        inner = None
+        for sub_id, sub in subgraphs.items():
+            if sub["line"] < directive["line"] < (sub["end_line"] or model["lines"] + 1):
+                if inner is None or sub["line"] > subgraphs[inner]["line"]:
+                    inner = sub_id
+        if inner is not None:
+            sub_directions[inner] = directive["text"]
+
+    stub_ids: Dict[tuple, str] = {}
+
+    def stub_id(node_id: str, part: int) -> str:
+        key = (node_id, part)
+        if key not in stub_ids:
+            candidate = f"{node_id}_part{part + 1}"
+            while candidate in model["nodes"] or candidate in subgraphs:
+                candidate += "_"
+            stub_ids[key] = candidate
+        return stub_ids[key]
+
+    edges: List[List[str]] = [[] for _ in parts]
+    stubs: List[Dict[str, str]] = [{} for _ in parts]
+    for edge in model["edges"]:
+        source_part = part_of.get(edge["source"], sub_part.get(edge["source"]))
+        target_part = part_of.get(edge["target"], sub_part.get(edge["target"]))
+        if source_part is None:
+            source_part = target_part if target_part is not None else 0
+        if target_part is None:
+            target_part = source_part
+        if source_part == target_part:
+            edges[source_part].append(f"{INDENT}{edge['source']} {edge['text']} {edge['target']}")
+            continue
+        to_stub = stub_id(edge["target"], target_part)
+        from_stub = stub_id(edge["source"], source_part)
+        edges[source_part].append(f"{INDENT}{edge['source']} {edge['text']} {to_stub}")
+        edges[target_part].append(f"{INDENT}{from_stub} {edge['text']} {edge['target']}")
+        stubs[source_part].setdefault(to_stub, _stub_label(model, edge["target"], "→", target_part + 1))
+        stubs[target_part].setdefault(from_stub, _stub_label(model, edge["source"], "←", source_part + 1))
+
+    keyword = chart_type(chart)
+    header = f"{keyword} {model['direction']}".rstrip()
+    total = len(parts)
+    bodies = []
+    for index, part in enumerate(parts):
+        in_part = set(part)
+        lines = []
+        if model["front_matter"]:
+            lines.extend(model["front_matter"].split("\n"))
+        else:
+            lines.extend(["---", f"title: Part {index + 1} of {total}", "---"])
+        lines.append(header)
+        lines.append(f"{INDENT}%% Part {index + 1} of {total}, split from a chart of "
+                     f"{len(model['nodes'])} nodes and {len(model['edges'])} edges")
+
+        # Nodes, nested in every subgraph that holds one of them
+        direct: Dict[Optional[str], List[str]] = {}
+        for node_id in sorted(part, key=lambda node_id: model["nodes"][node_id]["line"]):
+            direct.setdefault(model["nodes"][node_id]["subgraph"], []).append(node_id)
+        wanted = set()
+        for sub_id in list(direct):
+            while sub_id is not None and sub_id not in wanted:
+                wanted.add(sub_id)
+                sub_id = subgraphs[sub_id]["parent"]
+        children: Dict[Optional[str], List[str]] = {}
+        for sub_id in subgraphs:
+            if sub_id in wanted:
+                children.setdefault(subgraphs[sub_id]["parent"], []).append(sub_id)
+
+        def emit(sub_id: Optional[str], depth: int) -> None:
+            pad = INDENT * depth
+            if sub_id in sub_directions:
+                lines.append(pad + sub_directions[sub_id])
+            for node_id in direct.get(sub_id, ()):
+                lines.append(pad + model["nodes"][node_id]["text"])
+            for child in children.get(sub_id, ()):
+                lines.append(pad + _subgraph_header(subgraphs[child]))
+                emit(child, depth + 1)
+                lines.append(pad + "end")
+
+        emit(None, 1)
+        for stub, label in stubs[index].items():
+            lines.append(f'{INDENT}{stub}(["{label}"]):::{STUB_CLASS}')
+        lines.extend(edges[index])
+        for text in directives:
+            kept = _directive_for_part(text, lambda node_id: node_id in in_part or node_id in wanted)
+            if kept is not None:
+                lines.append(INDENT + kept)
+        if stubs[index]:
+            lines.append(INDENT + STUB_CLASS_DEF)
+        bodies.append(newline.join(lines) + newline)
+    return bodies
+
+def split_mermaid(content: str, max_nodes: int = DEFAULT_MAX_NODES,
+                  max_edges: int = DEFAULT_MAX_EDGES, stats: Optional[dict] = None) -> str:
+    """Replace every oversized ```mermaid block in a document with one block per part.
+
+    Returns content itself when nothing was split. Pass a dict from
+    new_split_stats() to count charts seen, charts split and parts written.
+    """
+    pieces = []
+    copied = 0
+    for start, end in iter_mermaid_blocks(content):
+        if stats is not None:
+            stats["charts"] += 1
+        opener_start = content.rfind("\n", 0, start - 1) + 1
+        opener = content[opener_start:start].rstrip("\r\n")
+        newline = "\r\n" if content[start - 2:start] == "\r\n" else "\n"
+        bodies = split_chart(content[start:end], max_nodes, max_edges, newline)
+        if len(bodies) < 2:
+            continue
+        fence = FENCE_OPENER.match(opener)
+        closer = fence.group(1) + fence.group(2)
+        between = newline + closer + newline + newline + opener + newline
+        pieces.append(content[copied:start])
+        pieces.append(between.join(body.rstrip("\r\n") for body in bodies) + newline)
+        copied = end
+        if stats is not None:
+            stats["charts_split"] += 1
+            stats["parts"] += len(bodies)
+    if not pieces:
+        return content
+    pieces.append(content[copied:])
+    return "".join(pieces)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Split mermaid flowcharts that are too big for GitHub to render.")
+    parser.add_argument("paths", nargs="+", help="markdown files, or directories to search recursively")
+    parser.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES,
+                        help=f"split flowcharts with more nodes than this (default {DEFAULT_MAX_NODES})")
+    parser.add_argument("--max-edges", type=int, default=DEFAULT_MAX_EDGES,
+                        help=f"split flowcharts with more edges than this (default {DEFAULT_MAX_EDGES})")
+    parser.add_argument("-i", "--in-place", action="store_true", help="rewrite files that hold oversized charts")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any chart would be split")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print errors and the summary")
+    args = parser.parse_args(argv)
+    if args.max_nodes < 1 or args.max_edges < 1:
+        parser.error("--max-nodes and --max-edges must be at least 1")
+
+    totals = new_split_stats()
+    files = errors = 0
+    for path in iter_markdown_files(args.paths):
+        files += 1
+        stats = new_split_stats()
+        try:
+            # newline='' keeps CRLF files byte for byte outside the split charts
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                content = f.read()
+            split = split_mermaid(content, args.max_nodes, args.max_edges, stats)
+            if split is not content and args.in_place and not args.check:
+                write_text_atomic(path, split)
+        except (OSError, UnicodeDecodeError) as e:
+            errors += 1
+            print(f"❌ {path}: {type(e).__name__}: {e}", file=sys.stderr)
+            continue
+        for key in totals:
+            totals[key] += stats[key]
+        if stats["charts_split"] and not args.quiet:
+            verb = "Split" if args.in_place and not args.check else "Would split"
+            print(f"✂️  {verb} {stats['charts_split']} chart(s) into {stats['parts']} parts in {path}")
+
+    if totals["charts_split"] == 0:
+        print(f"✅ No oversized charts in {files} file(s) ({totals['charts']} charts checked)")
+    else:
+        print(f"⚠️  {totals['charts_split']} of {totals['charts']} charts over {args.max_nodes} nodes "
+              f"or {args.max_edges} edges")
+    if errors:
+        return 1
+    return 1 if args.check and totals["charts_split"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
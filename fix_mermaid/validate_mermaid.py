@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Offline syntax check for the mermaid charts in markdown files.
+
+Catches the mistakes that make GitHub refuse to render a chart, without a
+browser or network: unbalanced brackets and blocks, characters that break
+an unquoted label, unknown arrow types and labels too long to display. It
+covers the flowchart, sequence and state grammars; other chart types are
+counted but not checked.
+
+It is a line-oriented check, not a full mermaid parser, so it errs on the
+side of silence: anything it reports is worth fixing, but a clean run is
+not a guarantee. A typical chart of a few dozen lines takes well under a
+millisecond, so it is cheap enough for a post-write hook.
+
+Usage:
+    python3 validate_mermaid.py doc.md [docs/ ...]     # exit 1 on errors
+    python3 validate_mermaid.py --strict docs/          # warnings fail too
+    python3 validate_mermaid.py --timings docs/         # per-chart timing
+"""
+
+import re
+import sys
+import time
+import argparse
+from typing import Callable, Dict, List, Optional
+
+from fix_mermaid import (FLOWCHART_KEYWORDS, LABEL_SEPARATOR, LEXER_STOPS, MAX_LABEL_LENGTH,
+                         QUOTE_TRIGGERS, SHAPES_BY_CHAR, chart_type, display_width, find_label_end,
+                         iter_markdown_files, iter_mermaid_blocks)
+
+ERROR = "error"
+WARNING = "warning"
+
+DIRECTIONS = ("TB", "TD", "BT", "RL", "LR")
+# Statements that carry no nodes or links; only their quoting is checked
+FLOWCHART_DIRECTIVES = ("classDef", "class", "style", "linkStyle", "click", "direction")
+FLOWCHART_LINK = re.compile(r"""
+      <?-{2,}>?       # --- --> <--> and the '--' that opens '-- text -->'
+    | <?={2,}>?       # === ==> <==> and '=='
+    | <?-\.+->?       # -.- -.-> -..->
+    | -\.             # opens '-. text .->'
+    | \.+->?          # closes it
+    | ~{3,}           # invisible link
+""", re.VERBOSE)
+LINK_RUN = re.compile(r"[-=.~<>]{2,}")
+
+SEQUENCE_ARROWS = {"->", "-->", "->>", "-->>", "-x", "--x", "-)", "--)", "<<->>", "<<-->>"}
+SEQUENCE_BLOCKS = ("loop", "alt", "opt", "par", "critical", "break", "rect", "box")
+SEQUENCE_BRANCHES = ("else", "and", "option")
+SEQUENCE_STATEMENTS = ("participant", "actor", "create", "destroy", "activate", "deactivate",
+                       "autonumber", "title", "link", "links", "properties", "details")
+SEQUENCE_ARROW_RUN = re.compile(r"[-<>=~]*[-=~][-<>=~]*")
+NOTE_POSITION = re.compile(r"(?i)note\s+(left of|right of|over)\s+[^:]+:")
+
+STATE_ARROW = "-->"
+STATE_TYPES = ("fork", "join", "choice")
+STATE_STATEMENTS = ("direction", "classDef", "class", "style", "hide", "scale")
+
+KNOWN_CHART_TYPES = set(FLOWCHART_KEYWORDS) | {
+    "sequenceDiagram", "stateDiagram", "stateDiagram-v2", "classDiagram", "erDiagram", "gantt",
+    "pie", "journey", "gitGraph", "mindmap", "timeline", "quadrantChart", "requirementDiagram",
+    "C4Context", "C4Container", "C4Component", "C4Dynamic", "C4Deployment", "sankey-beta",
+    "xychart-beta", "block-beta", "packet-beta", "architecture-beta", "kanban", "zenuml", "radar-beta",
+}
+
+def _issue(line: int, severity: str, kind: str, message: str) -> dict:
+    return {"line": line, "severity": severity, "kind": kind, "message": message}
+
+def _first_word(text: str) -> str:
+    return text.split(None, 1)[0] if text else ""
+
+def _check_label(issues: List[dict], number: int, label: str, what: str = "label",
+                 structural: bool = True) -> None:
+    """Report characters that break a label, and overlong label lines.
+
+    structural: brackets, braces, parentheses and '|' end an unquoted label
+    (true for node labels; edge and state text only cannot hold a quote).
+    """
+    quoted = len(label) >= 2 and label[0] == label[-1] == '"'
+    text = label[1:-1] if quoted else label
+    if '"' in text:
+        issues.append(_issue(number, ERROR, "character", f"'\"' inside {what} {label!r}"))
+    elif structural and not quoted:
+        bad = sorted(QUOTE_TRIGGERS.intersection(text))
+        if bad:
+            chars = " ".join(f"'{char}'" for char in bad)
+            issues.append(_issue(number, ERROR, "character",
+                                 f"{chars} in unquoted {what} {label!r}; quote it"))
+    longest = max((display_width(part) for part in text.split(LABEL_SEPARATOR)), default=0)
+    if longest > MAX_LABEL_LENGTH:
+        issues.append(_issue(number, WARNING, "length",
+                             f"{what} line is {longest} cells wide (max {MAX_LABEL_LENGTH})"))
+
+def _strip_quotes(issues: List[dict], number: int, text: str) -> str:
+    """Blank out "quoted strings", reporting an unclosed quote."""
+    if '"' not in text:
+        return text
+    if text.count('"') % 2:
+        issues.append(_issue(number, ERROR, "bracket", "unclosed '\"'"))
+        return text[:text.index('"')]
+    return re.sub(r'"[^"]*"', '""', text)
+
+def _check_balance(issues: List[dict], number: int, text: str) -> None:
+    """Report brackets that are not closed, or closed by the wrong kind, on one line."""
+    pairs = {")": "(", "]": "[", "}": "{"}
+    stack = []
+    for char in text:
+        if char in "([{":
+            stack.append(char)
+        elif char in pairs:
+            if not stack or stack.pop() != pairs[char]:
+                issues.append(_issue(number, ERROR, "bracket", f"unmatched '{char}'"))
+                return
+    if stack:
+        issues.append(_issue(number, ERROR, "bracket", f"'{stack[-1]}' is not closed"))
+
+def _flowchart_line(issues: List[dict], number: int, line: str) -> None:
+    """Check node and edge labels and link arrows of one flowchart statement line."""
+    skeleton = []
+    copied = 0
+    pos = 0
+    size = len(line)
+    while True:
+        stop = LEXER_STOPS.search(line, pos)
+        if stop is None:
+            break
+        pos = stop.start()
+        char = line[pos]
+        if char == "%":
+            pos += 1
+            continue
+        if char == '"':
+            quote_end = line.find('"', pos + 1)
+            if quote_end == -1:
+                issues.append(_issue(number, ERROR, "bracket", "unclosed '\"'"))
+                break
+            skeleton.append(line[copied:pos])
+            copied = pos = quote_end + 1
+            continue
+        if char == "|":
+            found = find_label_end(line, pos + 1, size, ("|",))
+            if found is None:
+                issues.append(_issue(number, ERROR, "bracket", "edge label '|' is not closed"))
+                break
+            label_end = found[0]
+            _check_label(issues, number, line[pos + 1:label_end], "edge label", structural=False)
+            skeleton.append(line[copied:pos])
+            copied = pos = label_end + 1
+            continue
+        for opener, closers in SHAPES_BY_CHAR[char]:
+            if line.startswith(opener, pos):
+                found = find_label_end(line, pos + len(opener), size, closers)
+                if found is None:
+                    continue
+                label_end, closer = found
+                _check_label(issues, number, line[pos + len(opener):label_end])
+                skeleton.append(line[copied:pos] + " ")
+                copied = pos = label_end + len(closer)
+                break
+        else:
+            issues.append(_issue(number, ERROR, "bracket", f"'{char}' at column {pos + 1} is not closed"))
+            pos += 1
+    skeleton.append(line[copied:])
+    for link in LINK_RUN.finditer("".join(skeleton)):
+        token = link.group()
+        if any(char in token for char in "-=~") and not FLOWCHART_LINK.fullmatch(token):
+            issues.append(_issue(number, ERROR, "arrow", f"unknown link '{token}'"))
+
+def validate_flowchart(lines: List[str], first_line: int = 1) -> List[dict]:
+    issues: List[dict] = []
+    subgraphs: List[int] = []
+    header_seen = False
+    for index, raw in enumerate(lines):
+        number = first_line + index
+        line = raw.strip()
+        if not line or line.startswith("%%"):
+            continue
+        word = _first_word(line)
+        if not header_seen:
+            header_seen = True
+            parts = line.split(";", 1)[0].split()
+            if len(parts) > 1 and parts[1] not in DIRECTIONS:
+                issues.append(_issue(number, ERROR, "header",
+                                     f"unknown direction '{parts[1]}' (use {', '.join(DIRECTIONS)})"))
+            continue
+        if word == "subgraph":
+            subgraphs.append(number)
+            _flowchart_line(issues, number, line[len(word):])
+        elif word == "end" and line.rstrip(";") == "end":
+            if not subgraphs:
+                issues.append(_issue(number, ERROR, "block", "'end' without 'subgraph'"))
+            else:
+                subgraphs.pop()
+        elif word in FLOWCHART_DIRECTIVES:
+            _strip_quotes(issues, number, line)
+        else:
+            _flowchart_line(issues, number, line)
+    for number in subgraphs:
+        issues.append(_issue(number, ERROR, "block", "'subgraph' is never closed with 'end'"))
+    return issues
+
+def _sequence_arrow(text: str) -> Optional[tuple]:
+    """Return (arrow, start, end) of the message arrow in text, or None.
+
+    The longest run that is a known arrow wins, so hyphenated names such
+    as 'Web-Server' never hide the real arrow. Without a known arrow, the
+    first run that is not a hyphen inside a name is returned for reporting.
+    """
+    best = unknown = None
+    for match in SEQUENCE_ARROW_RUN.finditer(text):
+        start, end = match.span()
+        arrow = match.group()
+        if end < len(text) and text[end] in "x)" and arrow in ("-", "--"):
+            arrow += text[end]
+            end += 1
+        elif arrow.endswith("-") and arrow[:-1] in SEQUENCE_ARROWS:
+            arrow = arrow[:-1]  # A trailing '-' deactivates the target
+        if arrow in SEQUENCE_ARROWS:
+            if best is None or len(arrow) > len(best[0]):
+                best = (arrow, start, end)
+        elif unknown is None and not (set(arrow) == {"-"} and 0 < start and end < len(text)
+                                      and text[start - 1].isalnum() and text[end].isalnum()):
+            unknown = (arrow, start, end)
+    return best or unknown
+
+def validate_sequence(lines: List[str], first_line: int = 1) -> List[dict]:
+    issues: List[dict] = []
+    blocks: List[tuple] = []
+    for index, raw in enumerate(lines[1:], 1):
+        number = first_line + index
+        line = raw.strip()
+        if not line or line.startswith("%%"):
+            continue
+        word = _first_word(line)
+        lower = word.lower()
+        if word in SEQUENCE_BLOCKS:
+            blocks.append((number, word))
+            if word in ("rect", "box"):
+                _check_balance(issues, number, _strip_quotes(issues, number, line))
+        elif word in SEQUENCE_BRANCHES:
+            if not blocks:
+                issues.append(_issue(number, ERROR, "block", f"'{word}' outside a block"))
+        elif word == "end":
+            if not blocks:
+                issues.append(_issue(number, ERROR, "block", "'end' without an open block"))
+            else:
+                blocks.pop()
+        elif lower == "note":
+            if not NOTE_POSITION.match(line):
+                issues.append(_issue(number, ERROR, "statement",
+                                     "note needs 'left of', 'right of' or 'over' and a ': text'"))
+        elif word in SEQUENCE_STATEMENTS:
+            _strip_quotes(issues, number, line)
+        else:
+            head, colon, text = line.partition(":")
+            found = _sequence_arrow(head)
+            if found is None:
+                issues.append(_issue(number, ERROR, "statement", f"expected a message like 'A->>B: text', got {line!r}"))
+                continue
+            arrow = found[0]
+            if arrow not in SEQUENCE_ARROWS:
+                issues.append(_issue(number, ERROR, "arrow", f"unknown message arrow '{arrow}'"))
+            if not colon:
+                issues.append(_issue(number, ERROR, "statement", "message has no ': text'"))
+            elif ";" in text:
+                issues.append(_issue(number, ERROR, "character",
+                                     "';' ends the statement inside message text; write #59; instead"))
+    for number, word in blocks:
+        issues.append(_issue(number, ERROR, "block", f"'{word}' is never closed with 'end'"))
+    return issues
+
+def validate_state(lines: List[str], first_line: int = 1) -> List[dict]:
+    issues: List[dict] = []
+    composites: List[int] = []
+    in_note = False
+    for index, raw in enumerate(lines[1:], 1):
+        number = first_line + index
+        line = raw.strip()
+        if in_note:
+            in_note = line.lower() != "end note"
+            continue
+        if not line or line.startswith("%%") or line == "--":
+            continue
+        word = _first_word(line)
+        if word.lower() == "note":
+            in_note = ":" not in line
+            continue
+        if word in STATE_STATEMENTS:
+            continue
+        if line == "}":
+            if not composites:
+                issues.append(_issue(number, ERROR, "bracket", "'}' without an open state"))
+            else:
+                composites.pop()
+            continue
+        head, colon, label = line.partition(":")
+        head = _strip_quotes(issues, number, head)
+        if head.rstrip().endswith("{"):
+            composites.append(number)
+            head = head.rstrip()[:-1]
+        for kind in re.findall(r"<<(\w+)>>", head):
+            if kind not in STATE_TYPES:
+                issues.append(_issue(number, ERROR, "statement", f"unknown state type '<<{kind}>>'"))
+        skeleton = re.sub(r"<<\w+>>", "", head).replace("[*]", "")
+        _check_balance(issues, number, skeleton)
+        for link in LINK_RUN.finditer(skeleton):
+            if link.group() != STATE_ARROW:
+                issues.append(_issue(number, ERROR, "arrow", f"unknown transition '{link.group()}' (use '-->')"))
+        if colon:
+            _check_label(issues, number, label.strip(), "state label", structural=False)
+    for number in composites:
+        issues.append(_issue(number, ERROR, "bracket", "'{' is never closed"))
+    return issues
+
+VALIDATORS: Dict[str, Callable[[List[str], int], List[dict]]] = {
+    **{keyword: validate_flowchart for keyword in FLOWCHART_KEYWORDS},
+    "sequenceDiagram": validate_sequence,
+    "stateDiagram": validate_state,
+    "stateDiagram-v2": validate_state,
+}
+
+def validate_chart(chart: str, first_line: int = 1) -> List[dict]:
+    """Issues in one chart body; first_line is the document line the body starts on."""
+    kind = chart_type(chart)
+    if not kind:
+        return [_issue(first_line, ERROR, "header", "chart is empty")]
+    lines = chart.split("\n")
+    # Issues are numbered from the diagram keyword line, which may follow front matter
+    keyword_index = next(i for i, line in enumerate(lines) if _first_word(line.strip()) == kind)
+    validator = VALIDATORS.get(kind)
+    if validator is None:
+        if kind not in KNOWN_CHART_TYPES:
+            return [_issue(first_line + keyword_index, ERROR, "header", f"unknown diagram type '{kind}'")]
+        return []
+    issues = validator(lines[keyword_index:], first_line + keyword_index)
+    issues.sort(key=lambda issue: issue["line"])
+    return issues
+
+def validate_document(content: str, stats: Optional[dict] = None) -> List[dict]:
+    """Issues in every ```mermaid block of a markdown document, with document line numbers.
+
+    With a stats dict, counts 'charts', 'checked' (charts of a validated
+    type) and the slowest chart in 'max_seconds'.
+    """
+    issues = []
+    line = 1
+    counted_to = 0
+    for start, end in iter_mermaid_blocks(content):
+        line += content.count("\n", counted_to, start)
+        counted_to = start
+        chart = content[start:end]
+        began = time.perf_counter()
+        issues.extend(validate_chart(chart, line))
+        if stats is not None:
+            elapsed = time.perf_counter() - began
+            stats["charts"] = stats.get("charts", 0) + 1
+            stats["checked"] = stats.get("checked", 0) + (chart_type(chart) in VALIDATORS)
+            stats["seconds"] = stats.get("seconds", 0.0) + elapsed
+            stats["max_seconds"] = max(stats.get("max_seconds", 0.0), elapsed)
+    return issues
+
+def validate_file(path: str, stats: Optional[dict] = None) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return validate_document(f.read(), stats)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check mermaid charts in markdown files for GitHub render errors.")
+    parser.add_argument("paths", nargs="+", help="markdown files, or directories to search recursively")
+    parser.add_argument("--strict", action="store_true", help="fail on warnings (long labels) too")
+    parser.add_argument("--timings", action="store_true", help="print mean and slowest per-chart time")
+    args = parser.parse_args(argv)
+
+    stats: dict = {}
+    errors = warnings = files = 0
+    for path in iter_markdown_files(args.paths):
+        files += 1
+        try:
+            issues = validate_file(path, stats)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"❌ {path}: {type(e).__name__}: {e}")
+            errors += 1
+            continue
+        for issue in issues:
+            print(f"{path}:{issue['line']}: {issue['severity']}: {issue['message']}")
+            errors += issue["severity"] == ERROR
+            warnings += issue["severity"] == WARNING
+
+    charts = stats.get("charts", 0)
+    if args.timings and charts:
+        print(f"Validated {charts} charts: mean {stats['seconds'] / charts * 1e6:.0f}us, "
+              f"slowest {stats['max_seconds'] * 1e6:.0f}us")
+    failed = errors or (args.strict and warnings)
+    status = "❌" if failed else ("⚠️" if warnings else "✅")
+    print(f"{status} {files} files, {charts} charts ({stats.get('checked', 0)} checked): "
+          f"{errors} errors, {warnings} warnings")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())